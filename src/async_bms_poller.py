@@ -0,0 +1,37 @@
+from async_surron_bms_communication import AsyncSurronBmsCommunication
+from async_surron_communication import AsyncSurronCommunication
+from async_serial_communication import AsyncSerialCommunication
+from bms_params import BmsParameterId
+import asyncio
+import logging
+import sys
+
+poll_params = [
+    BmsParameterId.BatteryVoltage,
+    BmsParameterId.BatteryCurrent,
+    BmsParameterId.BatteryPercent,
+]
+
+
+async def poll_port(port: str):
+    comm = AsyncSurronCommunication(AsyncSerialCommunication(port))
+    bms_comm = AsyncSurronBmsCommunication(comm)
+
+    while True:
+        values = await bms_comm.read_parameters(poll_params)
+        print(f"{port}: " + ", ".join(f"{p.name}={v}" for p, v in values.items()))
+        await asyncio.sleep(1)
+
+
+async def poll_ports(ports: list[str]):
+    await asyncio.gather(*(poll_port(port) for port in ports))
+
+
+def main():
+    logging.basicConfig(level=logging.DEBUG)
+    ports = sys.argv[1:] or ["/dev/ttyUSB0"]
+    asyncio.run(poll_ports(ports))
+
+
+if __name__ == "__main__":
+    main()
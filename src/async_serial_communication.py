@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import serial
+from serial_communication import SURRON_BAUDRATE
+
+
+class AsyncSerialCommunication:
+    # Same read/write/reset contract as SerialCommunication, but the port is polled
+    # by the event loop (add_reader on the file descriptor) instead of blocking in
+    # serial.read, so many ports can share one loop. Requires a POSIX event loop.
+    def __init__(
+        self, port: str, reconnect_delay: float = 0.1, max_reconnect_delay: float = 5.0
+    ):
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reconnects = 0
+        self.serial = serial.Serial(port, SURRON_BAUDRATE, timeout=0)
+        self.buffer = bytearray()
+        self.data_received = asyncio.Event()
+        self.loop = None
+
+    def _start_reading(self):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.loop.add_reader(self.serial.fileno(), self._on_readable)
+
+    def _stop_reading(self):
+        if self.loop is not None:
+            self.loop.remove_reader(self.serial.fileno())
+            self.loop = None
+
+    def _on_readable(self):
+        try:
+            self.buffer += self.serial.read(self.serial.in_waiting or 1)
+        except serial.SerialException as e:
+            # device is gone, stop polling it until reopen() brings it back
+            logging.warning(f"{self.port}: Read failed ({e})")
+            self._stop_reading()
+            self.serial.close()
+        self.data_received.set()
+
+    async def read(self, length: int, timeout: float) -> bytes:
+        if not self.serial.is_open:
+            # closed by _on_readable after the device dropped
+            await self.reopen()
+        self._start_reading()
+        deadline = self.loop.time() + timeout
+
+        while len(self.buffer) < length:
+            remaining_time = deadline - self.loop.time()
+            if remaining_time <= 0:
+                break
+            self.data_received.clear()
+            try:
+                await asyncio.wait_for(self.data_received.wait(), remaining_time)
+            except asyncio.TimeoutError:
+                break
+
+        data = bytes(self.buffer[:length])
+        del self.buffer[:length]
+        return data
+
+    async def write(self, data: bytes):
+        if not self.serial.is_open:
+            await self.reopen()
+        self._start_reading()
+        try:
+            self.serial.write(data)
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Write failed ({e}), reconnecting")
+            await self.reopen()
+            self.serial.write(data)
+        # wait until the data has left the wire like SerialCommunication's flush()
+        # would, 8N1 = 10 bits per byte
+        await asyncio.sleep(len(data) * 10 / SURRON_BAUDRATE)
+
+    def reset_input_buffer(self):
+        if self.serial.is_open:
+            self.serial.reset_input_buffer()
+        self.buffer.clear()
+
+    async def send_break(self, duration: float = 0.01):
+        if not self.serial.is_open:
+            return
+        self.serial.break_condition = True
+        await asyncio.sleep(duration)
+        self.serial.break_condition = False
+
+    def close(self):
+        self._stop_reading()
+        self.serial.close()
+
+    async def reopen(self):
+        # retries with backoff until the device is back, e.g. after a replug
+        self._stop_reading()
+        self.buffer.clear()
+        delay = self.reconnect_delay
+        while True:
+            try:
+                self.serial.close()
+                self.serial.open()
+                self.reconnects += 1
+                return
+            except serial.SerialException as e:
+                logging.warning(
+                    f"{self.port}: Reconnect failed ({e}), retry in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
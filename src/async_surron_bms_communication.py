@@ -0,0 +1,36 @@
+from typing import Optional
+from bms_params import BmsParameterId
+import bms_params
+from async_surron_communication import AsyncSurronCommunication
+
+
+class AsyncSurronBmsCommunication:
+    def __init__(self, comm: AsyncSurronCommunication):
+        self.comm = comm
+
+    async def read_raw_parameter_data(
+        self, parameter: BmsParameterId
+    ) -> Optional[bytes]:
+        return await self.comm.read_register(
+            bms_params.BMS_ADDRESS,
+            parameter.value,
+            parameter.length,
+        )
+
+    async def read_parameter(self, parameter: BmsParameterId):
+        data = await self.read_raw_parameter_data(parameter)
+        return bms_params.decode_bms_data(parameter, data)
+
+    async def read_parameters(self, parameters: list[BmsParameterId]) -> dict:
+        results = await self.comm.read_registers(
+            [
+                (bms_params.BMS_ADDRESS, parameter.value, parameter.length)
+                for parameter in parameters
+            ]
+        )
+        return {
+            parameter: None
+            if data is None
+            else bms_params.decode_bms_data(parameter, data)
+            for parameter, data in zip(parameters, results)
+        }
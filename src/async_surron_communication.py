@@ -0,0 +1,85 @@
+from async_serial_communication import AsyncSerialCommunication
+from surron_data_packet import SurronDataPacket
+from surron_metrics import SurronMetrics
+from surron_adaptive_timeout import AdaptiveTimeout
+from serial_recovery_policy import SerialRecoveryPolicy
+from surron_protocol import Register, Steps, SurronIo, SurronProtocol
+from typing import Optional, Tuple
+import asyncio
+
+
+class AsyncSurronCommunication(SurronProtocol):
+    # awaits the SurronProtocol steps on an AsyncSerialCommunication
+    def __init__(
+        self,
+        serial: AsyncSerialCommunication,
+        metrics: Optional[SurronMetrics] = None,
+        adaptive_timeout: Optional[AdaptiveTimeout] = None,
+        recovery: Optional[SerialRecoveryPolicy] = None,
+    ):
+        super().__init__(metrics, adaptive_timeout, recovery, f"{serial.port}: ")
+        self.serial = serial
+        # one request/response exchange on the bus at a time
+        self.lock = asyncio.Lock()
+
+    async def _run(self, steps: Steps):
+        try:
+            step, argument = next(steps)
+            while True:
+                result = None
+                if step is SurronIo.Read:
+                    result = await self.serial.read(*argument)
+                elif step is SurronIo.Write:
+                    await self.serial.write(argument)
+                elif step is SurronIo.Sleep:
+                    await asyncio.sleep(argument)
+                elif step is SurronIo.ResetInput:
+                    self.serial.reset_input_buffer()
+                elif step is SurronIo.Break:
+                    await self.serial.send_break()
+                elif step is SurronIo.Reopen:
+                    await self.serial.reopen()
+                step, argument = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def read_register(
+        self, address: int, parameter: int, parameter_length: int
+    ) -> Optional[bytes]:
+        async with self.lock:
+            return await self._run(
+                self.read_register_steps(address, parameter, parameter_length)
+            )
+
+    async def read_registers(
+        self,
+        registers: list[Register],
+        max_in_flight: int = 4,
+        trials: int = 3,
+        match_length: bool = True,
+        probe_timeout: Optional[float] = None,
+        receive_times: Optional[dict[Register, float]] = None,
+    ) -> list[Optional[bytes]]:
+        async with self.lock:
+            return await self._run(
+                self.read_registers_steps(
+                    registers,
+                    max_in_flight,
+                    trials,
+                    match_length,
+                    probe_timeout,
+                    receive_times,
+                )
+            )
+
+    async def receive_packet(
+        self, timeout: float
+    ) -> Tuple[str, Optional[SurronDataPacket]]:
+        return await self._run(self.receive_packet_steps(timeout))
+
+    async def recover(self):
+        await self._run(self.recover_steps())
+
+    def reset_input_buffer(self):
+        self.serial.reset_input_buffer()
+        self.parser.reset()
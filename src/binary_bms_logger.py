@@ -0,0 +1,53 @@
+from surron_communication import SurronCommunication
+from serial_communication import SerialCommunication
+from surron_data_packet import SurronDataPacket
+from surron_cmd import SurronCmd
+from bms_binary_log import BinaryLogWriter
+from bms_params import BmsParameterId
+import bms_params
+import logging
+import time
+
+
+logged_params = [
+    BmsParameterId.RtcTime,
+    BmsParameterId.BatteryVoltage,
+    BmsParameterId.BatteryCurrent,
+    BmsParameterId.BatteryPercent,
+    BmsParameterId.BatteryHealth,
+    BmsParameterId.RemainingCapacity,
+    BmsParameterId.TotalCapacity,
+    BmsParameterId.ChargeCycles,
+    BmsParameterId.Temperatures,
+    BmsParameterId.Statistics,
+    BmsParameterId.CellVoltages1,
+]
+
+
+def main():
+    comm = SurronCommunication(serial=SerialCommunication("/dev/ttyUSB0"))
+
+    logging.basicConfig(level=logging.DEBUG)
+
+    with BinaryLogWriter("bms_data.bin") as log:
+        while True:
+            registers = [
+                (bms_params.BMS_ADDRESS, param.value, param.length)
+                for param in logged_params
+            ]
+            results = comm.read_registers(registers)
+            timestamp = time.time()
+
+            for register, data in zip(registers, results):
+                if data is None:
+                    continue
+                packet = SurronDataPacket.create(
+                    SurronCmd.ReadResponse, *register, data
+                )
+                log.write_packet(packet, timestamp)
+
+            time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
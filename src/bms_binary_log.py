@@ -0,0 +1,143 @@
+from surron_data_packet import SurronDataPacket
+from bms_params import BmsParameterId
+from typing import Iterator, Optional, Tuple
+import bms_params
+import bisect
+import csv
+import mmap
+import os
+import struct
+import sys
+import time
+
+# Append-only log of raw framed packets:
+#   file:   MAGIC, record*
+#   record: timestamp (float64, unix time), frame length (uint16), frame bytes
+MAGIC = b"SRNBLOG1"
+RECORD_HEADER = struct.Struct("<dH")
+
+
+class BinaryLogWriter:
+    def __init__(
+        self, path: str, fsync_interval: float = 10.0, buffer_size: int = 64 * 1024
+    ):
+        self.fsync_interval = fsync_interval
+        self.file = open(path, "ab", buffering=buffer_size)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.last_sync = time.monotonic()
+
+    def write_frame(self, frame: bytes, timestamp: Optional[float] = None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.file.write(RECORD_HEADER.pack(timestamp, len(frame)))
+        self.file.write(frame)
+
+        if time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def write_packet(self, packet: SurronDataPacket, timestamp: Optional[float] = None):
+        self.write_frame(packet.to_bytes(), timestamp)
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class BinaryLogReader:
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a binary BMS log")
+
+        # only the record headers are read up front, frames are parsed on access
+        self.offsets: list[int] = []
+        self.timestamps: list[float] = []
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(self.map):
+            timestamp, length = RECORD_HEADER.unpack_from(self.map, offset)
+            if offset + RECORD_HEADER.size + length > len(self.map):
+                break  # truncated last record, e.g. power loss while writing
+            self.offsets.append(offset)
+            self.timestamps.append(timestamp)
+            offset += RECORD_HEADER.size + length
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def index_at(self, timestamp: float) -> int:
+        # first record at or after timestamp, records are written in time order
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def frame(self, index: int) -> Tuple[float, memoryview]:
+        offset = self.offsets[index]
+        timestamp, length = RECORD_HEADER.unpack_from(self.map, offset)
+        start = offset + RECORD_HEADER.size
+        return timestamp, memoryview(self.map)[start : start + length]
+
+    def packets(
+        self, start_time: Optional[float] = None, end_time: Optional[float] = None
+    ) -> Iterator[Tuple[float, SurronDataPacket]]:
+        start = 0 if start_time is None else self.index_at(start_time)
+        end = len(self) if end_time is None else self.index_at(end_time)
+        for index in range(start, end):
+            timestamp, frame = self.frame(index)
+            yield timestamp, SurronDataPacket.from_bytes(bytes(frame))
+
+    def values(
+        self, start_time: Optional[float] = None, end_time: Optional[float] = None
+    ) -> Iterator[Tuple[float, BmsParameterId, object]]:
+        for timestamp, packet in self.packets(start_time, end_time):
+            if packet.address != bms_params.BMS_ADDRESS or not packet.command_data:
+                continue
+            parameter = bms_params.get_parameter(packet.parameter)
+            if parameter is None or parameter.length != packet.data_length:
+                continue
+            yield (
+                timestamp,
+                parameter,
+                bms_params.decode_bms_data(parameter, packet.command_data),
+            )
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def export_csv(log_path: str, csv_path: str):
+    with BinaryLogReader(log_path) as reader, open(csv_path, "w") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Timestamp", "Column", "Value"])
+        for timestamp, parameter, value in reader.values():
+            flat = bms_params.flatten_bms_data(parameter, value)
+            for column, column_value in flat.items():
+                writer.writerow([f"{timestamp:.3f}", column, column_value])
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(f"Usage: {sys.argv[0]} <binary log> <csv output>")
+        sys.exit(1)
+    export_csv(sys.argv[1], sys.argv[2])
+
+
+if __name__ == "__main__":
+    main()
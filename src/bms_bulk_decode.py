@@ -0,0 +1,133 @@
+from typing import Union
+import numpy as np
+from bms_params import BmsParameterId, BMS_ADDRESS
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket
+
+# Bulk counterpart of bms_params.decode_bms_data for offline decoding of captured
+# payloads/frames. Everything here works on whole (N, length) uint8 matrices.
+
+_MILLI_UINT32 = np.dtype("<u4")
+_MILLI_INT32 = np.dtype("<i4")
+
+# parameter -> (dtype of one payload, whether the value is divided by 1000 or, for
+# structured dtypes, the names of the fields that are)
+_LAYOUTS = {
+    BmsParameterId.Temperatures: (
+        np.dtype(
+            [
+                ("cell_temperatures", "i1", (3,)),
+                ("_reserved", "u1"),
+                ("discharge_fet", "i1"),
+                ("charge_fet", "i1"),
+                ("soft_start_circuit", "i1"),
+                ("_unused", "u1"),
+            ]
+        ),
+        (),
+    ),
+    BmsParameterId.BatteryVoltage: (_MILLI_UINT32, True),
+    BmsParameterId.BatteryCurrent: (_MILLI_INT32, True),
+    BmsParameterId.BatteryPercent: (np.dtype("u1"), False),
+    BmsParameterId.BatteryHealth: (np.dtype("u1"), False),
+    BmsParameterId.RemainingCapacity: (_MILLI_UINT32, True),
+    BmsParameterId.TotalCapacity: (_MILLI_UINT32, True),
+    BmsParameterId.Statistics: (
+        np.dtype(
+            [
+                ("total_capacity", "<u4"),
+                ("lifetime_charged", "<u4"),
+                ("current_cycle", "<u4"),
+            ]
+        ),
+        ("total_capacity", "lifetime_charged", "current_cycle"),
+    ),
+    BmsParameterId.ChargeCycles: (np.dtype("<u4"), False),
+    BmsParameterId.DesignedCapacity: (_MILLI_UINT32, True),
+    BmsParameterId.DesignedVoltage: (_MILLI_UINT32, True),
+    BmsParameterId.CellVoltages1: (np.dtype(("<u2", (16,))), True),
+    BmsParameterId.CellVoltages2: (np.dtype(("<u2", (16,))), True),
+    BmsParameterId.History: (
+        np.dtype(
+            [
+                ("out_max", "<i4"),
+                ("in_max", "<i4"),
+                ("max_cell_voltage", "<u2"),
+                ("min_cell_voltage", "<u2"),
+                ("max_temp", "i1"),
+                ("min_temp", "i1"),
+            ]
+        ),
+        ("out_max", "in_max", "max_cell_voltage", "min_cell_voltage"),
+    ),
+}
+
+
+def to_matrix(data: Union[bytes, bytearray, memoryview, list], length: int):
+    # contiguous buffer of N * length bytes or a list of length-byte payloads
+    if isinstance(data, list):
+        data = b"".join(data)
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if buffer.size % length != 0:
+        raise ValueError(
+            f"Buffer length {buffer.size} is not a multiple of the record length {length}"
+        )
+    return buffer.reshape(-1, length)
+
+
+def decode_payloads(
+    parameter_id: BmsParameterId, payloads
+) -> Union[np.ndarray, dict[str, np.ndarray]]:
+    # scaled the same way decode_bms_data scales single values; parameters without
+    # a numeric layout are returned as the raw (N, length) uint8 matrix
+    matrix = to_matrix(payloads, parameter_id.length)
+    if parameter_id not in _LAYOUTS:
+        return matrix
+
+    dtype, scaled = _LAYOUTS[parameter_id]
+    # sub-array dtypes (cell voltages) come out as (N, 16), payloads longer than
+    # the decoded part (BatteryHealth) are cut to the dtype's size
+    records = np.frombuffer(
+        np.ascontiguousarray(matrix[:, : dtype.itemsize]), dtype=dtype
+    )
+
+    if dtype.names is None:
+        return records / 1000.0 if scaled else records
+
+    return {
+        name: records[name] / 1000.0 if name in scaled else records[name]
+        for name in dtype.names
+        if not name.startswith("_")
+    }
+
+
+def calc_checksums(frames: np.ndarray) -> np.ndarray:
+    # SurronDataPacket.calc_checksum for every row at once
+    return (frames[:, :-1].sum(axis=1, dtype=np.uint32) % 256).astype(np.uint8)
+
+
+def validate_frames(
+    parameter_id: BmsParameterId, frames: np.ndarray, address: int = BMS_ADDRESS
+) -> np.ndarray:
+    return (
+        (calc_checksums(frames) == frames[:, -1])
+        & (frames[:, 0] == SurronCmd.ReadResponse.value)
+        & (frames[:, 1] == address & 0xFF)
+        & (frames[:, 2] == address >> 8)
+        & (frames[:, 3] == parameter_id.value)
+        & (frames[:, 4] == parameter_id.length)
+    )
+
+
+def decode_frames(
+    parameter_id: BmsParameterId, frames, address: int = BMS_ADDRESS
+) -> tuple[Union[np.ndarray, dict[str, np.ndarray]], np.ndarray]:
+    # full ReadResponse frames; returns the decoded valid rows and the validity mask
+    frame_length = SurronDataPacket.get_packet_length(
+        SurronCmd.ReadResponse, parameter_id.length
+    )
+    matrix = to_matrix(frames, frame_length)
+    valid = validate_frames(parameter_id, matrix, address)
+    header_length = SurronDataPacket.HEADER_LENGTH
+    payloads = matrix[valid, header_length : header_length + parameter_id.length]
+    return decode_payloads(parameter_id, payloads.tobytes()), valid
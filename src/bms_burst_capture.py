@@ -0,0 +1,211 @@
+from surron_communication import SurronCommunication
+from serial_communication import open_serial
+from bms_params import BmsParameterId
+from array import array
+from datetime import datetime
+from typing import Optional
+import bms_params
+import csv
+import logging
+import operator
+import os
+import re
+import sys
+import time
+
+# one ring row per fast sample, FetTemperature is the last slow reading held
+COLUMNS = ["Timestamp", "BatteryVoltage", "BatteryCurrent"]
+COLUMNS += [f"Cell{i}Voltage" for i in range(1, 17)]
+COLUMNS += ["FetTemperature"]
+_INDEX = {column: i for i, column in enumerate(COLUMNS)}
+
+FAST_REGISTERS = [
+    (bms_params.BMS_ADDRESS, parameter.value, parameter.length)
+    for parameter in (
+        BmsParameterId.BatteryVoltage,
+        BmsParameterId.BatteryCurrent,
+        BmsParameterId.CellVoltages1,
+    )
+]
+TEMPERATURE_REGISTER = (
+    bms_params.BMS_ADDRESS,
+    BmsParameterId.Temperatures.value,
+    BmsParameterId.Temperatures.length,
+)
+
+_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+_EXPRESSION = re.compile(r"^\s*(\w+)\s*(<=|>=|<|>)\s*(-?[\d.]+)\s*$")
+
+
+class Trigger:
+    # "<column> <op> <limit>", columns are COLUMNS plus CellMin, CellMax and
+    # CellDelta. Fires on the sample where the condition becomes true.
+    def __init__(self, expression: str):
+        match = _EXPRESSION.match(expression)
+        if match is None:
+            raise ValueError(f"invalid trigger expression: {expression!r}")
+        column, op, limit = match.groups()
+        if column not in _INDEX and column not in ("CellMin", "CellMax", "CellDelta"):
+            raise ValueError(f"unknown trigger column: {column}")
+        self.expression = expression.strip()
+        self.column = column
+        self.compare = _OPERATORS[op]
+        self.limit = float(limit)
+        self.active = False
+        self.fired = 0
+
+    def evaluate(self, sample: dict[str, float]) -> bool:
+        active = self.compare(sample[self.column], self.limit)
+        fired = active and not self.active
+        self.active = active
+        if fired:
+            self.fired += 1
+        return fired
+
+
+class BurstCapture:
+    def __init__(
+        self,
+        comm: SurronCommunication,
+        triggers: list[str],
+        directory: str = ".",
+        pre_samples: int = 200,
+        post_samples: int = 200,
+        temperature_period: float = 1.0,
+    ):
+        self.comm = comm
+        self.triggers = [Trigger(expression) for expression in triggers]
+        self.directory = directory
+        self.pre_samples = pre_samples
+        self.post_samples = post_samples
+        self.temperature_period = temperature_period
+
+        # preallocated ring, memory stays constant however long this runs
+        self.width = len(COLUMNS)
+        self.capacity = pre_samples + post_samples + 1
+        self.buffer = array("d", [0.0]) * (self.capacity * self.width)
+        self.head = 0  # next row to write
+        self.count = 0
+
+        self.fet_temperature = float("nan")
+        self.next_temperature = 0.0
+        self.pending: Optional[Trigger] = None
+        self.pre_available = 0
+        self.post_remaining = 0
+        self.samples = 0
+        self.bursts = 0
+
+    def sample(self) -> Optional[dict[str, float]]:
+        now = time.monotonic()
+        registers = list(FAST_REGISTERS)
+        if now >= self.next_temperature:
+            registers.append(TEMPERATURE_REGISTER)
+        results = self.comm.read_registers(registers)
+        if any(data is None for data in results[: len(FAST_REGISTERS)]):
+            return None
+        timestamp = time.time()
+
+        if len(results) > len(FAST_REGISTERS) and results[-1] is not None:
+            temperatures = bms_params.decode_bms_data(
+                BmsParameterId.Temperatures, results[-1]
+            )
+            self.fet_temperature = float(
+                max(temperatures["discharge_fet"], temperatures["charge_fet"])
+            )
+            self.next_temperature = now + self.temperature_period
+
+        voltage = bms_params.decode_bms_data(BmsParameterId.BatteryVoltage, results[0])
+        current = bms_params.decode_bms_data(BmsParameterId.BatteryCurrent, results[1])
+        cells = bms_params.decode_bms_data(BmsParameterId.CellVoltages1, results[2])
+
+        offset = self.head * self.width
+        buffer = self.buffer
+        buffer[offset] = timestamp
+        buffer[offset + 1] = voltage
+        buffer[offset + 2] = current
+        for i, cell in enumerate(cells):
+            buffer[offset + 3 + i] = cell
+        buffer[offset + self.width - 1] = self.fet_temperature
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.samples += 1
+
+        # unused cell slots read 0V
+        present = [cell for cell in cells if cell > 0] or [0.0]
+        values = {column: buffer[offset + i] for i, column in enumerate(COLUMNS)}
+        values["CellMin"] = min(present)
+        values["CellMax"] = max(present)
+        values["CellDelta"] = values["CellMax"] - values["CellMin"]
+        return values
+
+    def step(self):
+        values = self.sample()
+        if values is None:
+            return
+
+        for trigger in self.triggers:
+            if trigger.evaluate(values) and self.pending is None:
+                logging.info(f"Trigger fired: {trigger.expression}")
+                self.pending = trigger
+                # the pre window must not be overwritten by the post window
+                self.pre_available = min(self.count - 1, self.pre_samples)
+                self.post_remaining = self.post_samples
+
+        if self.pending is not None:
+            if self.post_remaining == 0:
+                self.flush(self.pre_available + 1 + self.post_samples)
+            else:
+                self.post_remaining -= 1
+
+    def rows(self, count: int):
+        # last count rows, oldest first
+        start = (self.head - count) % self.capacity
+        for n in range(count):
+            offset = ((start + n) % self.capacity) * self.width
+            yield self.buffer[offset : offset + self.width]
+
+    def flush(self, count: int):
+        trigger = self.pending
+        rows = list(self.rows(count))
+        trigger_time = rows[self.pre_available][0]
+        name = re.sub(r"\W+", "_", trigger.expression).strip("_")
+        stamp = datetime.fromtimestamp(trigger_time).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"burst_{stamp}_{name}.csv")
+
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["Offset"] + COLUMNS)
+            for row in rows:
+                writer.writerow([f"{row[0] - trigger_time:.3f}"] + row.tolist())
+
+        logging.info(f"Wrote {count} samples around {trigger.expression} to {path}")
+        self.pending = None
+        self.bursts += 1
+
+    def run(self):
+        while True:
+            self.step()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <port> <trigger> [trigger ...]")
+        print(
+            f'  e.g. {sys.argv[0]} /dev/ttyUSB0 "BatteryCurrent < -80" "CellMin < 2.9"'
+        )
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+
+    comm = SurronCommunication(serial=open_serial(sys.argv[1]))
+    capture = BurstCapture(comm, sys.argv[2:])
+    capture.run()
+
+
+if __name__ == "__main__":
+    main()
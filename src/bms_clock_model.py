@@ -0,0 +1,57 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Optional
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class BmsClockModel:
+    # Least squares fit of BMS RtcTime against the host monotonic clock:
+    #   bms_seconds = offset + rate * (monotonic - reference)
+    # so rows can be stamped in BMS time without reading RtcTime for each of them.
+    # RtcTime only has 1s resolution, so drift only shows over hours: the default
+    # window is a day of samples at one per minute.
+    def __init__(self, window: int = 1440):
+        self.samples: deque[tuple[float, float]] = deque(maxlen=window)
+        self.reference: Optional[float] = None
+        self.offset = 0.0
+        self.rate = 1.0
+
+    def add(self, monotonic: float, rtc_time: datetime):
+        if self.reference is None:
+            self.reference = monotonic
+        # the RTC truncates, the real time is somewhere within the next second
+        bms_seconds = (rtc_time - _EPOCH).total_seconds() + 0.5
+        if self.samples and bms_seconds < self.samples[-1][1] - 1.0:
+            # BMS clock was set back, the old samples no longer fit
+            self.samples.clear()
+        self.samples.append((monotonic - self.reference, bms_seconds))
+        self.fit()
+
+    def fit(self):
+        n = len(self.samples)
+        mean_x = sum(x for x, _ in self.samples) / n
+        mean_y = sum(y for _, y in self.samples) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in self.samples)
+        # too short a baseline to tell drift from the 1s quantization
+        if n < 2 or sxx < 60.0**2:
+            self.rate = 1.0
+        else:
+            sxy = sum((x - mean_x) * (y - mean_y) for x, y in self.samples)
+            self.rate = sxy / sxx
+        self.offset = mean_y - self.rate * mean_x
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.samples)
+
+    @property
+    def drift_ppm(self) -> float:
+        # positive when the BMS clock runs fast
+        return (self.rate - 1.0) * 1e6
+
+    def bms_time(self, monotonic: float) -> Optional[datetime]:
+        if not self.ready:
+            return None
+        bms_seconds = self.offset + self.rate * (monotonic - self.reference)
+        return _EPOCH + timedelta(seconds=bms_seconds)
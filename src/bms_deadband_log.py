@@ -0,0 +1,235 @@
+from dataclasses import dataclass
+from bms_params import BmsParameterId
+from typing import Iterator, Optional, Tuple
+import bms_params
+import csv
+import os
+import sys
+import time
+
+# Change-only log, one delta record per changed column:
+#   Timestamp, Column, Type, Value
+# Type is i(nt), f(loat), b(ool) or s(tring), so the reader gives back exactly
+# what was recorded, e.g. a serial number "000123" stays a string.
+HEADER = ["Timestamp", "Column", "Type", "Value"]
+# Every column is written again at least once per heartbeat interval, so a
+# reader starting anywhere in the file sees every column within that time.
+
+
+@dataclass
+class Deadband:
+    # a change is recorded once it exceeds either bound, 0 for both means any change
+    absolute: float = 0.0
+    relative: float = 0.0
+
+    def exceeded(self, last, value) -> bool:
+        if not isinstance(value, (int, float)) or not isinstance(last, (int, float)):
+            return value != last
+        change = abs(value - last)
+        if self.absolute == 0.0 and self.relative == 0.0:
+            return change != 0
+        if self.absolute and change >= self.absolute:
+            return True
+        # with last == 0 any relative bound is 0, only a real change counts then
+        return (
+            bool(self.relative) and change > 0 and change >= self.relative * abs(last)
+        )
+
+
+DEFAULT_DEADBANDS = {
+    BmsParameterId.BatteryVoltage.name: Deadband(absolute=0.05),
+    BmsParameterId.BatteryCurrent.name: Deadband(absolute=0.1),
+    BmsParameterId.CellVoltages1.name: Deadband(absolute=0.002),
+    BmsParameterId.CellVoltages2.name: Deadband(absolute=0.002),
+    BmsParameterId.Temperatures.name: Deadband(absolute=1.0),
+    BmsParameterId.RemainingCapacity.name: Deadband(relative=0.001),
+}
+
+
+class DeadbandRecorder:
+    # deadbands are looked up by column name first, then by parameter name,
+    # e.g. "CellVoltages1" covers "CellVoltages1[3]"
+    def __init__(
+        self,
+        path: str,
+        deadbands: Optional[dict[str, Deadband]] = None,
+        default: Deadband = Deadband(),
+        heartbeat: float = 600.0,
+        fsync_interval: float = 10.0,
+    ):
+        self.deadbands = DEFAULT_DEADBANDS if deadbands is None else deadbands
+        self.default = default
+        self.heartbeat = heartbeat
+        self.fsync_interval = fsync_interval
+        # last recorded value and time per column
+        self.last: dict[str, Tuple[float, object]] = {}
+        self.written = 0
+        self.skipped = 0
+
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow(HEADER)
+        else:
+            with open(path, newline="") as log_file:
+                if next(csv.reader(log_file), None) != HEADER:
+                    self.file.close()
+                    raise ValueError(f"{path} is not a deadband log of this version")
+        self.last_sync = time.monotonic()
+
+    def deadband(self, parameter: BmsParameterId, column: str) -> Deadband:
+        deadband = self.deadbands.get(column)
+        if deadband is None:
+            deadband = self.deadbands.get(parameter.name, self.default)
+        return deadband
+
+    def record(
+        self, parameter: BmsParameterId, value, timestamp: Optional[float] = None
+    ) -> int:
+        # returns the number of delta records written
+        if timestamp is None:
+            timestamp = time.time()
+        written = 0
+        for column, column_value in bms_params.flatten_bms_data(
+            parameter, value
+        ).items():
+            last = self.last.get(column)
+            if (
+                last is not None
+                and timestamp - last[0] < self.heartbeat
+                and not self.deadband(parameter, column).exceeded(last[1], column_value)
+            ):
+                self.skipped += 1
+                continue
+            self.writer.writerow(
+                [f"{timestamp:.3f}", column, _value_type(column_value), column_value]
+            )
+            self.last[column] = (timestamp, column_value)
+            written += 1
+
+        self.written += written
+        if time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+        return written
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _value_type(value) -> str:
+    if isinstance(value, bool):
+        return "b"
+    if isinstance(value, int):
+        return "i"
+    if isinstance(value, float):
+        return "f"
+    return "s"
+
+
+def _parse_value(value_type: str, text: str):
+    if value_type == "i":
+        return int(text)
+    if value_type == "f":
+        return float(text)
+    if value_type == "b":
+        return text == "True"
+    return text
+
+
+class DeadbandLogReader:
+    def __init__(self, path: str):
+        self.path = path
+
+    def records(self) -> Iterator[Tuple[float, str, object]]:
+        with open(self.path, newline="") as log_file:
+            reader = csv.reader(log_file)
+            next(reader, None)
+            for row in reader:
+                if len(row) != len(HEADER):
+                    continue  # truncated last line
+                yield float(row[0]), row[1], _parse_value(row[2], row[3])
+
+    def columns(self) -> list[str]:
+        columns = {}
+        for _, column, _ in self.records():
+            columns.setdefault(column, None)
+        return list(columns)
+
+    def rows(self) -> Iterator[Tuple[float, dict[str, object]]]:
+        # sample-and-hold state after every timestamp that had a change
+        state = {}
+        current = None
+        for timestamp, column, value in self.records():
+            if current is not None and timestamp != current:
+                yield current, dict(state)
+            current = timestamp
+            state[column] = value
+        if current is not None:
+            yield current, dict(state)
+
+    def resample(
+        self,
+        interval: float,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+    ) -> Iterator[Tuple[float, dict[str, object]]]:
+        # full series on a fixed grid, each column holds its last recorded value
+        state = {}
+        sample_time = start_time
+        last_time = None
+        for timestamp, column, value in self.records():
+            if sample_time is None:
+                sample_time = timestamp
+            while sample_time < timestamp:
+                if end_time is not None and sample_time > end_time:
+                    return
+                if state:
+                    yield sample_time, dict(state)
+                sample_time += interval
+            state[column] = value
+            last_time = timestamp
+
+        if last_time is None:
+            return
+        while sample_time <= last_time and (
+            end_time is None or sample_time <= end_time
+        ):
+            yield sample_time, dict(state)
+            sample_time += interval
+
+
+def export_csv(log_path: str, csv_path: str, interval: Optional[float] = None):
+    reader = DeadbandLogReader(log_path)
+    columns = reader.columns()
+    rows = reader.rows() if interval is None else reader.resample(interval)
+    with open(csv_path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["Timestamp"] + columns)
+        for timestamp, state in rows:
+            writer.writerow(
+                [f"{timestamp:.3f}"] + [state.get(column, "") for column in columns]
+            )
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        print(f"Usage: {sys.argv[0]} <deadband log> <csv output> [interval]")
+        sys.exit(1)
+    interval = float(sys.argv[3]) if len(sys.argv) == 4 else None
+    export_csv(sys.argv[1], sys.argv[2], interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from bms_params import BmsParameterId
+from typing import Optional
+import math
+
+# CellVoltages1 has cells 1-16 and CellVoltages2 cells 17-32
+CELLS_PER_PARAMETER = 16
+
+
+class RunningStats:
+    # Welford's algorithm, O(1) per sample
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> dict[str, float]:
+        if self.count == 0:
+            return {}
+        return {
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class Integrator:
+    # trapezoidal integration of a signal over time, positive and negative parts
+    # are accumulated separately (charge vs discharge)
+    def __init__(self):
+        self.last: Optional[tuple[float, float]] = None
+        self.positive = 0.0
+        self.negative = 0.0
+
+    def update(self, timestamp: float, value: float):
+        if self.last is not None:
+            last_timestamp, last_value = self.last
+            area = (last_value + value) / 2 * (timestamp - last_timestamp)
+            if area >= 0:
+                self.positive += area
+            else:
+                self.negative -= area
+        self.last = (timestamp, value)
+
+    @property
+    def total(self) -> float:
+        return self.positive - self.negative
+
+
+class DerivedMetrics:
+    # Fed with decode_bms_data output as it arrives, keeps all aggregates up to
+    # date so nothing has to re-read the log. Timestamps are in seconds, a
+    # monotonic clock is best. Positive current is charging. Power and energy
+    # get one sample per BatteryCurrent reading, paired with the latest voltage,
+    # so a poll cycle has to pass its voltage first (update_all does that).
+    def __init__(self):
+        self.voltage: Optional[float] = None
+        self.current: Optional[float] = None
+        # fixed slots, unread and unused cells are 0V
+        self.cells: list[float] = [0.0] * (2 * CELLS_PER_PARAMETER)
+        self.power = RunningStats()
+        self.current_stats = RunningStats()
+        self.energy = Integrator()  # watt seconds
+        self.charge = Integrator()  # amp seconds
+        self.cell_delta = RunningStats()
+        self.cell_drift: list[RunningStats] = []
+        self.temperature = RunningStats()
+        self.fet_temperature = RunningStats()
+        self.reference_capacity: Optional[float] = None
+        self.reference_charge = 0.0
+        self.remaining_capacity: Optional[float] = None
+
+    def update(self, parameter: BmsParameterId, value, timestamp: float):
+        if parameter == BmsParameterId.BatteryVoltage:
+            self.voltage = value
+        elif parameter == BmsParameterId.BatteryCurrent:
+            self.current = value
+            self.current_stats.update(value)
+            self.charge.update(timestamp, value)
+            self._update_power(timestamp)
+        elif parameter == BmsParameterId.CellVoltages1:
+            self._update_cells(value + self.cells[CELLS_PER_PARAMETER:])
+        elif parameter == BmsParameterId.CellVoltages2:
+            self._update_cells(self.cells[:CELLS_PER_PARAMETER] + value)
+        elif parameter == BmsParameterId.Temperatures:
+            self.temperature.update(max(value["cell_temperatures"]))
+            self.fet_temperature.update(
+                max(value["discharge_fet"], value["charge_fet"])
+            )
+        elif parameter == BmsParameterId.RemainingCapacity:
+            self.remaining_capacity = value
+            if self.reference_capacity is None:
+                self.reference_capacity = value
+                self.reference_charge = self.charge.total
+
+    def update_all(
+        self,
+        values: dict[BmsParameterId, object],
+        timestamps: dict[BmsParameterId, float],
+    ):
+        # one poll cycle, voltage before current so power uses this cycle's voltage
+        voltage = values.get(BmsParameterId.BatteryVoltage)
+        if voltage is not None:
+            self.update(
+                BmsParameterId.BatteryVoltage,
+                voltage,
+                timestamps[BmsParameterId.BatteryVoltage],
+            )
+        for parameter, value in values.items():
+            if parameter != BmsParameterId.BatteryVoltage:
+                self.update(parameter, value, timestamps[parameter])
+
+    def _update_power(self, timestamp: float):
+        if self.voltage is None or self.current is None:
+            return
+        power = self.voltage * self.current
+        self.power.update(power)
+        self.energy.update(timestamp, power)
+
+    def _update_cells(self, cells: list[float]):
+        self.cells = cells
+        # unused cell slots read 0V
+        present = [cell for cell in cells if cell > 0]
+        if not present:
+            return
+        self.cell_delta.update(max(present) - min(present))
+
+        mean = sum(present) / len(present)
+        while len(self.cell_drift) < len(cells):
+            self.cell_drift.append(RunningStats())
+        for drift, cell in zip(self.cell_drift, cells):
+            if cell > 0:
+                drift.update(cell - mean)
+
+    @property
+    def estimated_capacity(self) -> Optional[float]:
+        # coulomb counted from the first RemainingCapacity reading, in Ah
+        if self.reference_capacity is None:
+            return None
+        return (
+            self.reference_capacity
+            + (self.charge.total - self.reference_charge) / 3600.0
+        )
+
+    @property
+    def soc_drift(self) -> Optional[float]:
+        # reported minus coulomb counted remaining capacity, in Ah
+        estimated = self.estimated_capacity
+        if estimated is None or self.remaining_capacity is None:
+            return None
+        return self.remaining_capacity - estimated
+
+    def values(self) -> dict[str, Optional[float]]:
+        present = [cell for cell in self.cells if cell > 0]
+        return {
+            "PackPower": None
+            if self.voltage is None or self.current is None
+            else self.voltage * self.current,
+            "EnergyInWh": self.energy.positive / 3600.0,
+            "EnergyOutWh": self.energy.negative / 3600.0,
+            "ChargeInAh": self.charge.positive / 3600.0,
+            "ChargeOutAh": self.charge.negative / 3600.0,
+            "CellMin": min(present) if present else None,
+            "CellMax": max(present) if present else None,
+            "CellDelta": max(present) - min(present) if present else None,
+            "CellDeltaMax": self.cell_delta.max if self.cell_delta.count else None,
+            "SocDrift": self.soc_drift,
+        }
+
+    def summary(self) -> dict:
+        return {
+            **self.values(),
+            "power": self.power.to_dict(),
+            "current": self.current_stats.to_dict(),
+            "cell_delta": self.cell_delta.to_dict(),
+            "cell_drift": [drift.to_dict() for drift in self.cell_drift],
+            "temperature": self.temperature.to_dict(),
+            "fet_temperature": self.fet_temperature.to_dict(),
+        }
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from enum import Enum
+from typing import Optional, Tuple
+from bms_params import BmsParameterId
+import bms_params
+import threading
+import time
+
+
+class CacheState(Enum):
+    Fresh = 1
+    Stale = 2
+    Miss = 3
+
+
+# when the key changes, the cached values of these parameters are dropped as well
+DEFAULT_DEPENDENTS = {
+    BmsParameterId.ChargeCycles: [
+        BmsParameterId.BatteryHealth,
+        BmsParameterId.TotalCapacity,
+        BmsParameterId.Statistics,
+        BmsParameterId.History,
+    ],
+    BmsParameterId.BatteryPercent: [BmsParameterId.RemainingCapacity],
+}
+
+
+class BmsParameterCache:
+    # ttls in seconds per parameter, None never expires (static identity values).
+    # After the ttl a value is still served for stale_time more seconds while it is
+    # refreshed in the background.
+    def __init__(
+        self,
+        ttls: Optional[dict[BmsParameterId, Optional[float]]] = None,
+        default_ttl: float = 1.0,
+        stale_time: float = 2.0,
+        max_size: int = 64,
+        dependents: Optional[dict[BmsParameterId, list[BmsParameterId]]] = None,
+    ):
+        self.ttls = {parameter: None for parameter in bms_params.get_static_params()}
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+        self.stale_time = stale_time
+        self.max_size = max_size
+        self.dependents = DEFAULT_DEPENDENTS if dependents is None else dependents
+        self.entries: OrderedDict[BmsParameterId, Tuple[object, float]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def ttl(self, parameter: BmsParameterId) -> Optional[float]:
+        return self.ttls.get(parameter, self.default_ttl)
+
+    def get(self, parameter: BmsParameterId) -> Tuple[CacheState, object]:
+        with self.lock:
+            entry = self.entries.get(parameter)
+            if entry is None:
+                self.misses += 1
+                return CacheState.Miss, None
+
+            value, stored_at = entry
+            ttl = self.ttl(parameter)
+            age = time.monotonic() - stored_at
+            if ttl is None or age <= ttl:
+                self.entries.move_to_end(parameter)
+                self.hits += 1
+                return CacheState.Fresh, value
+            if age <= ttl + self.stale_time:
+                self.stale_hits += 1
+                return CacheState.Stale, value
+
+            del self.entries[parameter]
+            self.misses += 1
+            return CacheState.Miss, None
+
+    def peek(self, parameter: BmsParameterId) -> Tuple[bool, object]:
+        # (fresh, value) without touching the statistics or the LRU order
+        with self.lock:
+            entry = self.entries.get(parameter)
+            if entry is None:
+                return False, None
+            value, stored_at = entry
+            ttl = self.ttl(parameter)
+            if ttl is None or time.monotonic() - stored_at <= ttl:
+                return True, value
+            return False, None
+
+    def put(self, parameter: BmsParameterId, value, stored_at: Optional[float] = None):
+        # stored_at is the monotonic time the value was received, defaults to now
+        if stored_at is None:
+            stored_at = time.monotonic()
+        with self.lock:
+            previous = self.entries.get(parameter)
+            if previous is not None and previous[0] != value:
+                for dependent in self.dependents.get(parameter, []):
+                    self.entries.pop(dependent, None)
+
+            self.entries[parameter] = (value, stored_at)
+            self.entries.move_to_end(parameter)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, parameter: Optional[BmsParameterId] = None):
+        with self.lock:
+            if parameter is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(parameter, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "size": len(self.entries),
+        }
@@ -1,6 +1,6 @@
 import struct
 from enum import Enum
-from typing import Union
+from typing import Optional, Union
 from datetime import datetime, date
 
 BMS_ADDRESS = 0x116
@@ -42,132 +42,194 @@ class BmsParameterId(Enum):
 
     @property
     def length(self) -> int:
-        return BmsParameterId.get_length(self)
+        return PARAMETER_LENGTHS[self]
 
     @staticmethod
     def get_length(parameter_id: "BmsParameterId") -> int:
-        lengths = {
-            BmsParameterId.Unknown_0: 4,
-            BmsParameterId.Unknown_7: 1,
-            BmsParameterId.Temperatures: 8,
-            BmsParameterId.BatteryVoltage: 4,
-            BmsParameterId.BatteryCurrent: 4,
-            BmsParameterId.BatteryPercent: 1,
-            BmsParameterId.BatteryHealth: 4,
-            BmsParameterId.RemainingCapacity: 4,
-            BmsParameterId.TotalCapacity: 4,
-            BmsParameterId.Unknown_17: 2,
-            BmsParameterId.Unknown_20: 4,
-            BmsParameterId.Statistics: 12,
-            BmsParameterId.BmsStatus: 10,
-            BmsParameterId.ChargeCycles: 4,
-            BmsParameterId.DesignedCapacity: 4,
-            BmsParameterId.DesignedVoltage: 4,
-            BmsParameterId.Versions: 8,
-            BmsParameterId.ManufacturingDate: 3,
-            BmsParameterId.Unknown_28: 4,
-            BmsParameterId.RtcTime: 6,
-            BmsParameterId.Unknown_30: 6,
-            BmsParameterId.BmsManufacturer: 16,
-            BmsParameterId.BatteryModel: 32,
-            BmsParameterId.CellType: 16,
-            BmsParameterId.SerialNumber: 32,
-            BmsParameterId.CellVoltages1: 32,
-            BmsParameterId.CellVoltages2: 32,
-            BmsParameterId.History: 14,
-            BmsParameterId.Unknown_39: 64,
-            BmsParameterId.Unknown_48: 64,
-            BmsParameterId.Unknown_120: 64,
-            BmsParameterId.Unknown_160: 32,
-        }
-
-        if parameter_id in lengths:
-            return lengths[parameter_id]
+        if parameter_id in PARAMETER_LENGTHS:
+            return PARAMETER_LENGTHS[parameter_id]
         else:
             raise ValueError(f"Unknown parameter {parameter_id}")
 
 
+PARAMETER_LENGTHS = {
+    BmsParameterId.Unknown_0: 4,
+    BmsParameterId.Unknown_7: 1,
+    BmsParameterId.Temperatures: 8,
+    BmsParameterId.BatteryVoltage: 4,
+    BmsParameterId.BatteryCurrent: 4,
+    BmsParameterId.BatteryPercent: 1,
+    BmsParameterId.BatteryHealth: 4,
+    BmsParameterId.RemainingCapacity: 4,
+    BmsParameterId.TotalCapacity: 4,
+    BmsParameterId.Unknown_17: 2,
+    BmsParameterId.Unknown_20: 4,
+    BmsParameterId.Statistics: 12,
+    BmsParameterId.BmsStatus: 10,
+    BmsParameterId.ChargeCycles: 4,
+    BmsParameterId.DesignedCapacity: 4,
+    BmsParameterId.DesignedVoltage: 4,
+    BmsParameterId.Versions: 8,
+    BmsParameterId.ManufacturingDate: 3,
+    BmsParameterId.Unknown_28: 4,
+    BmsParameterId.RtcTime: 6,
+    BmsParameterId.Unknown_30: 6,
+    BmsParameterId.BmsManufacturer: 16,
+    BmsParameterId.BatteryModel: 32,
+    BmsParameterId.CellType: 16,
+    BmsParameterId.SerialNumber: 32,
+    BmsParameterId.CellVoltages1: 32,
+    BmsParameterId.CellVoltages2: 32,
+    BmsParameterId.History: 14,
+    BmsParameterId.Unknown_39: 64,
+    BmsParameterId.Unknown_48: 64,
+    BmsParameterId.Unknown_120: 64,
+    BmsParameterId.Unknown_160: 32,
+}
+
+_PARAMETERS_BY_VALUE = {parameter.value: parameter for parameter in BmsParameterId}
+
+# all structs are compiled once at import time, decoding is a single unpack_from
+_UINT32 = struct.Struct("<I")
+_INT32 = struct.Struct("<i")
+_TEMPERATURES = struct.Struct("<3bx3b")
+_STATISTICS = struct.Struct("<3I")
+_CELL_VOLTAGES = struct.Struct("<16H")
+_HISTORY = struct.Struct("<iiHHbb")
+
+
+def _decode_temperatures(data: bytes) -> dict[str, Union[list[int], int]]:
+    t1, t2, t3, discharge_fet, charge_fet, soft_start_circuit = (
+        _TEMPERATURES.unpack_from(data)
+    )
+    return {
+        "cell_temperatures": [t1, t2, t3],
+        "discharge_fet": discharge_fet,
+        "charge_fet": charge_fet,
+        "soft_start_circuit": soft_start_circuit,
+    }
+
+
+def _decode_milli_uint32(data: bytes) -> float:
+    return _UINT32.unpack_from(data)[0] / 1000.0
+
+
+def _decode_milli_int32(data: bytes) -> float:
+    return _INT32.unpack_from(data)[0] / 1000.0
+
+
+def _decode_uint32(data: bytes) -> int:
+    return _UINT32.unpack_from(data)[0]
+
+
+def _decode_first_byte(data: bytes) -> int:
+    return data[0]
+
+
+def _decode_statistics(data: bytes) -> dict[str, float]:
+    total_capacity, lifetime_charged, current_cycle = _STATISTICS.unpack_from(data)
+    return {
+        "total_capacity": total_capacity / 1000.0,
+        "lifetime_charged": lifetime_charged / 1000.0,
+        "current_cycle": current_cycle / 1000.0,
+    }
+
+
+def _decode_versions(data: bytes) -> dict[str, str]:
+    sw_version = f"{data[1]}.{data[0]}"
+    hw_version = f"{data[3]}.{data[2]}"
+    idx = bytes(data[4:8]).decode("ascii").strip()
+    return {"sw_version": sw_version, "hw_version": hw_version, "idx": idx}
+
+
+def _decode_date(data: bytes) -> date:
+    return date(2000 + data[0], data[1], data[2])
+
+
+def _decode_datetime(data: bytes) -> datetime:
+    return datetime(2000 + data[0], data[1], data[2], data[3], data[4], data[5])
+
+
+def _decode_string(data: bytes) -> str:
+    return bytes(data).decode("ascii").strip()
+
+
+def _decode_cell_voltages(data: bytes) -> list[float]:
+    return [voltage / 1000.0 for voltage in _CELL_VOLTAGES.unpack_from(data)]
+
+
+def _decode_history(data: bytes) -> dict[str, Union[float, int]]:
+    out_max, in_max, max_cell, min_cell, max_temp, min_temp = _HISTORY.unpack_from(data)
+    return {
+        "out_max": out_max / 1000.0,
+        "in_max": in_max / 1000.0,
+        "max_cell_voltage": max_cell / 1000.0,
+        "min_cell_voltage": min_cell / 1000.0,
+        "max_temp": max_temp,
+        "min_temp": min_temp,
+    }
+
+
+DECODERS = {
+    BmsParameterId.Temperatures: _decode_temperatures,
+    BmsParameterId.BatteryVoltage: _decode_milli_uint32,
+    BmsParameterId.BatteryCurrent: _decode_milli_int32,
+    BmsParameterId.BatteryPercent: _decode_first_byte,
+    BmsParameterId.BatteryHealth: _decode_first_byte,
+    BmsParameterId.RemainingCapacity: _decode_milli_uint32,
+    BmsParameterId.TotalCapacity: _decode_milli_uint32,
+    BmsParameterId.Statistics: _decode_statistics,
+    BmsParameterId.ChargeCycles: _decode_uint32,
+    BmsParameterId.DesignedCapacity: _decode_milli_uint32,
+    BmsParameterId.DesignedVoltage: _decode_milli_uint32,
+    BmsParameterId.Versions: _decode_versions,
+    BmsParameterId.ManufacturingDate: _decode_date,
+    BmsParameterId.RtcTime: _decode_datetime,
+    BmsParameterId.BmsManufacturer: _decode_string,
+    BmsParameterId.BatteryModel: _decode_string,
+    BmsParameterId.CellType: _decode_string,
+    BmsParameterId.SerialNumber: _decode_string,
+    BmsParameterId.CellVoltages1: _decode_cell_voltages,
+    BmsParameterId.CellVoltages2: _decode_cell_voltages,
+    BmsParameterId.History: _decode_history,
+}
+
+
 def decode_bms_data(
     parameter_id: BmsParameterId, data: bytes
 ) -> Union[
     float, int, list[float], dict[str, Union[float, int]], str, datetime, date, bytes
 ]:
-    if parameter_id == BmsParameterId.Temperatures:
-        temperatures = [struct.unpack("b", data[i : i + 1])[0] for i in range(3)]
-        discharge_fet = struct.unpack("b", data[4:5])[0]
-        charge_fet = struct.unpack("b", data[5:6])[0]
-        soft_start_circuit = struct.unpack("b", data[6:7])[0]
-        return {
-            "cell_temperatures": temperatures,
-            "discharge_fet": discharge_fet,
-            "charge_fet": charge_fet,
-            "soft_start_circuit": soft_start_circuit,
-        }
-    elif parameter_id == BmsParameterId.BatteryVoltage:
-        return struct.unpack("<I", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.BatteryCurrent:
-        return struct.unpack("<i", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.BatteryPercent:
-        return data[0]
-    elif parameter_id == BmsParameterId.BatteryHealth:
-        return data[0]
-    elif parameter_id == BmsParameterId.RemainingCapacity:
-        return struct.unpack("<I", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.TotalCapacity:
-        return struct.unpack("<I", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.Statistics:
-        total_capacity = struct.unpack("<I", data[0:4])[0] / 1000.0
-        lifetime_charged = struct.unpack("<I", data[4:8])[0] / 1000.0
-        current_cycle = struct.unpack("<I", data[8:12])[0] / 1000.0
-        return {
-            "total_capacity": total_capacity,
-            "lifetime_charged": lifetime_charged,
-            "current_cycle": current_cycle,
-        }
-    elif parameter_id == BmsParameterId.ChargeCycles:
-        return struct.unpack("<I", data)[0]
-    elif parameter_id == BmsParameterId.DesignedCapacity:
-        return struct.unpack("<I", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.DesignedVoltage:
-        return struct.unpack("<I", data)[0] / 1000.0
-    elif parameter_id == BmsParameterId.Versions:
-        sw_version = f"{data[1]}.{data[0]}"
-        hw_version = f"{data[3]}.{data[2]}"
-        idx = data[4:8].decode("ascii").strip()
-        return {"sw_version": sw_version, "hw_version": hw_version, "idx": idx}
-    elif parameter_id == BmsParameterId.ManufacturingDate:
-        return date(2000 + data[0], data[1], data[2])
-    elif parameter_id == BmsParameterId.RtcTime:
-        return datetime(2000 + data[0], data[1], data[2], data[3], data[4], data[5])
-    elif parameter_id in {
-        BmsParameterId.BmsManufacturer,
-        BmsParameterId.BatteryModel,
-        BmsParameterId.CellType,
-        BmsParameterId.SerialNumber,
-    }:
-        return data.decode("ascii").strip()
-    elif parameter_id in {BmsParameterId.CellVoltages1, BmsParameterId.CellVoltages2}:
-        voltages = [
-            struct.unpack("<H", data[i : i + 2])[0] / 1000.0 for i in range(0, 32, 2)
-        ]
-        return voltages
-    elif parameter_id == BmsParameterId.History:
-        out_max = struct.unpack("<i", data[0:4])[0] / 1000.0
-        in_max = struct.unpack("<i", data[4:8])[0] / 1000.0
-        max_cell = struct.unpack("<H", data[8:10])[0] / 1000.0
-        min_cell = struct.unpack("<H", data[10:12])[0] / 1000.0
-        max_temp = struct.unpack("b", data[12:13])[0]
-        min_temp = struct.unpack("b", data[13:14])[0]
-        return {
-            "out_max": out_max,
-            "in_max": in_max,
-            "max_cell_voltage": max_cell,
-            "min_cell_voltage": min_cell,
-            "max_temp": max_temp,
-            "min_temp": min_temp,
-        }
-    else:
+    decoder = DECODERS.get(parameter_id)
+    if decoder is None:
         return data
+    return decoder(data)
+
+
+def get_parameter(value: int) -> Optional[BmsParameterId]:
+    return _PARAMETERS_BY_VALUE.get(value)
+
+
+def flatten_bms_data(parameter_id: BmsParameterId, value) -> dict[str, object]:
+    # one scalar per column, e.g. Temperatures.cell_temperatures[0]
+    flat = {}
+    _flatten_into(flat, parameter_id.name, value)
+    return flat
+
+
+def _flatten_into(flat: dict[str, object], name: str, value):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten_into(flat, f"{name}.{key}", item)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            _flatten_into(flat, f"{name}[{i}]", item)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        flat[name] = value.hex()
+    elif isinstance(value, (date, datetime)):
+        flat[name] = value.isoformat()
+    else:
+        flat[name] = value
 
 
 def get_scalar_params() -> list[BmsParameterId]:
@@ -188,3 +250,17 @@ def get_scalar_params() -> list[BmsParameterId]:
         BmsParameterId.CellType,
         BmsParameterId.SerialNumber,
     ]
+
+
+def get_static_params() -> list[BmsParameterId]:
+    # identity/design values that never change for a given battery
+    return [
+        BmsParameterId.DesignedCapacity,
+        BmsParameterId.DesignedVoltage,
+        BmsParameterId.Versions,
+        BmsParameterId.ManufacturingDate,
+        BmsParameterId.BmsManufacturer,
+        BmsParameterId.BatteryModel,
+        BmsParameterId.CellType,
+        BmsParameterId.SerialNumber,
+    ]
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Optional
+from bms_params import BmsParameterId
+from surron_bms_communication import SurronBmsCommunication
+import time
+
+
+@dataclass
+class PollStats:
+    period: Optional[float]
+    reads: int = 0
+    failures: int = 0
+
+    @property
+    def requested_rate(self) -> Optional[float]:
+        return None if not self.period else 1.0 / self.period
+
+
+class BmsPollScheduler:
+    # periods in seconds per parameter, None means static: read once and cached.
+    # Shorter periods have priority when more parameters are due than fit into
+    # one batch. A failed read is retried after its period, but no later than
+    # retry_delay.
+    def __init__(
+        self,
+        bms_comm: SurronBmsCommunication,
+        periods: dict[BmsParameterId, Optional[float]],
+        max_batch: int = 8,
+        retry_delay: float = 1.0,
+    ):
+        self.bms_comm = bms_comm
+        self.periods = periods
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.next_due = {parameter: 0.0 for parameter in periods}
+        self.values = {}
+        # (monotonic, wall clock) time each value was received
+        self.timestamps: dict[BmsParameterId, tuple[float, float]] = {}
+        self.stats = {
+            parameter: PollStats(period) for parameter, period in periods.items()
+        }
+        self.start_time = time.monotonic()
+
+    def due_parameters(self, now: float) -> list[BmsParameterId]:
+        due = [
+            parameter
+            for parameter, due_time in self.next_due.items()
+            if due_time <= now
+            and not (self.periods[parameter] is None and parameter in self.values)
+        ]
+        due.sort(
+            key=lambda parameter: (
+                self.periods[parameter] or 0.0,
+                self.next_due[parameter],
+            )
+        )
+        return due[: self.max_batch]
+
+    def poll(self) -> dict[BmsParameterId, object]:
+        # reads whatever is due and returns the freshly read values
+        now = time.monotonic()
+        due = self.due_parameters(now)
+        if not due:
+            return {}
+
+        receive_times = {}
+        values = self.bms_comm.read_parameters(due, receive_times)
+        # values from the cache have no receive time, they get the poll's
+        received = time.monotonic()
+        wall_clock_offset = time.time() - received
+        fresh = {}
+        for parameter, value in values.items():
+            stats = self.stats[parameter]
+            period = self.periods[parameter]
+            if value is None:
+                stats.failures += 1
+                self.next_due[parameter] = now + min(
+                    period or self.retry_delay, self.retry_delay
+                )
+                continue
+            stats.reads += 1
+            fresh[parameter] = value
+            self.values[parameter] = value
+            monotonic = receive_times.get(parameter, received)
+            self.timestamps[parameter] = (monotonic, monotonic + wall_clock_offset)
+            self.next_due[parameter] = float("inf") if period is None else now + period
+        return fresh
+
+    def time_until_due(self) -> float:
+        # inf once only static parameters are left and all of them were read
+        return max(
+            min(self.next_due.values(), default=float("inf")) - time.monotonic(), 0.0
+        )
+
+    def run(self, callback):
+        while True:
+            fresh = self.poll()
+            if fresh:
+                callback(fresh)
+            wait = self.time_until_due()
+            if wait == float("inf"):
+                # everything left is static and was read
+                return
+            time.sleep(wait)
+
+    def rates(self) -> dict[BmsParameterId, tuple[Optional[float], float]]:
+        # (requested, achieved) reads per second
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            parameter: (stats.requested_rate, stats.reads / elapsed)
+            for parameter, stats in self.stats.items()
+        }
+
+    def report(self) -> str:
+        lines = []
+        for parameter, (requested, achieved) in self.rates().items():
+            requested_str = "once" if requested is None else f"{requested:.2f}/s"
+            lines.append(
+                f"{parameter.name}: requested {requested_str}, achieved {achieved:.2f}/s, "
+                f"{self.stats[parameter].failures} failures"
+            )
+        return "\n".join(lines)
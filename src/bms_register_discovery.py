@@ -0,0 +1,147 @@
+from surron_communication import SurronCommunication
+from serial_communication import open_serial
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+import bms_params
+import json
+import logging
+import os
+import sys
+
+DEFAULT_MAP_PATH = "bms_parameter_map.json"
+
+
+@dataclass
+class DiscoveredRegister:
+    address: int
+    parameter: int
+    length: int
+    name: Optional[str] = None
+    data: str = ""
+
+
+def discover(
+    comm: SurronCommunication,
+    addresses: Iterable[int] = (bms_params.BMS_ADDRESS,),
+    parameters: Iterable[int] = range(256),
+    probe_length: int = 4,
+    batch_size: int = 16,
+    max_in_flight: int = 8,
+    probe_timeout: float = 0.1,
+) -> list[DiscoveredRegister]:
+    # Known parameters are requested with their length, unknown ones with
+    # probe_length. Responses are matched on address and parameter only, so the
+    # length in the ReadResponse header is taken as the real length.
+    registers = []
+    for address in addresses:
+        for parameter in parameters:
+            known = bms_params.get_parameter(parameter)
+            length = known.length if known is not None else probe_length
+            registers.append((address, parameter, length))
+
+    found = []
+    for start in range(0, len(registers), batch_size):
+        batch = registers[start : start + batch_size]
+        # a missing register is the common case here, retrying it wastes time and
+        # it must not stretch the timeouts or send breaks on the shared bus
+        results = comm.read_registers(
+            batch,
+            max_in_flight=max_in_flight,
+            trials=1,
+            match_length=False,
+            probe_timeout=probe_timeout,
+        )
+        for (address, parameter, _), data in zip(batch, results):
+            if data is None:
+                continue
+            known = bms_params.get_parameter(parameter)
+            found.append(
+                DiscoveredRegister(
+                    address=address,
+                    parameter=parameter,
+                    length=len(data),
+                    name=known.name if known is not None else None,
+                    data=bytes(data).hex(),
+                )
+            )
+            logging.debug(f"Found {address:#x}/{parameter}: {len(data)} bytes")
+    return found
+
+
+def save_parameter_map(path: str, registers: list[DiscoveredRegister]):
+    with open(path, "w") as map_file:
+        json.dump([asdict(register) for register in registers], map_file, indent=2)
+
+
+def load_parameter_map(path: str) -> list[DiscoveredRegister]:
+    with open(path) as map_file:
+        return [DiscoveredRegister(**register) for register in json.load(map_file)]
+
+
+def apply_parameter_map(registers: list[DiscoveredRegister]) -> int:
+    # use the discovered lengths for the undecoded (Unknown_*) BMS parameters,
+    # returns how many changed. Decoded parameters keep their length, their
+    # decoders unpack fixed structs.
+    changed = 0
+    for register in registers:
+        parameter = bms_params.get_parameter(register.parameter)
+        if register.address != bms_params.BMS_ADDRESS or parameter is None:
+            continue
+        if bms_params.PARAMETER_LENGTHS[parameter] == register.length:
+            continue
+        if parameter in bms_params.DECODERS:
+            logging.warning(
+                f"{parameter.name} answered with {register.length} bytes instead of "
+                f"{parameter.length}, keeping {parameter.length}"
+            )
+            continue
+        bms_params.PARAMETER_LENGTHS[parameter] = register.length
+        changed += 1
+    return changed
+
+
+def load_default_parameter_map() -> Optional[list[DiscoveredRegister]]:
+    # picks up the map of an earlier scan, if there is one
+    if not os.path.exists(DEFAULT_MAP_PATH):
+        return None
+    registers = load_parameter_map(DEFAULT_MAP_PATH)
+    changed = apply_parameter_map(registers)
+    logging.info(f"Loaded {DEFAULT_MAP_PATH}, {changed} parameter lengths changed")
+    return registers
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <port> [map file] [address ...] [--rescan]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+
+    args = [arg for arg in sys.argv[1:] if arg != "--rescan"]
+    rescan = "--rescan" in sys.argv
+    path = args[1] if len(args) > 1 else DEFAULT_MAP_PATH
+    addresses = [int(address, 0) for address in args[2:]] or [bms_params.BMS_ADDRESS]
+
+    if os.path.exists(path) and not rescan:
+        registers = load_parameter_map(path)
+        print(f"Loaded {len(registers)} registers from {path}, use --rescan to scan")
+    else:
+        comm = SurronCommunication(serial=open_serial(args[0]))
+        registers = discover(comm, addresses)
+        save_parameter_map(path, registers)
+        print(f"Found {len(registers)} registers, saved to {path}")
+
+    for register in registers:
+        known = bms_params.get_parameter(register.parameter)
+        note = ""
+        if known is not None and known.length != register.length:
+            note = f" (expected {known.length})"
+        name = register.name or "?"
+        print(
+            f"{register.address:#x} {register.parameter:3d} {name:20s} "
+            f"{register.length:3d}{note} {register.data}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+from surron_communication import SurronCommunication
+from serial_communication import SerialCommunication
+import logging
+
+
+def main():
+    comm = SurronCommunication(serial=SerialCommunication("/dev/ttyUSB0"))
+
+    logging.basicConfig(level=logging.DEBUG)
+
+    for record in comm.sniff():
+        print(record)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
 from surron_bms_communication import SurronBmsCommunication
+from bms_poll_scheduler import BmsPollScheduler
+from bms_derived_metrics import DerivedMetrics
+from bms_clock_model import BmsClockModel
 from surron_communication import SurronCommunication
 from serial_communication import SerialCommunication
 import csv
@@ -10,7 +13,6 @@ from datetime import datetime
 
 
 running_params_scalar = [
-    BmsParameterId.RtcTime,
     BmsParameterId.BatteryVoltage,
     BmsParameterId.BatteryCurrent,
     BmsParameterId.BatteryPercent,
@@ -20,17 +22,37 @@ running_params_scalar = [
     BmsParameterId.ChargeCycles,
 ]
 
+# seconds between reads, the slow changing values don't need to be read every row.
+# Rows are stamped on the host, RtcTime is only read to fit the BMS clock model.
+poll_periods = {
+    BmsParameterId.RtcTime: 60,
+    BmsParameterId.BatteryVoltage: 1,
+    BmsParameterId.BatteryCurrent: 1,
+    BmsParameterId.BatteryPercent: 10,
+    BmsParameterId.BatteryHealth: 600,
+    BmsParameterId.RemainingCapacity: 10,
+    BmsParameterId.TotalCapacity: 600,
+    BmsParameterId.ChargeCycles: 600,
+    BmsParameterId.Temperatures: 5,
+    BmsParameterId.Statistics: 10,
+    BmsParameterId.CellVoltages1: 1,
+}
+
 
 def main():
     comm = SurronCommunication(serial=SerialCommunication("/dev/ttyUSB0"))
     bms_comm = SurronBmsCommunication(comm)
+    scheduler = BmsPollScheduler(bms_comm, poll_periods, max_batch=len(poll_periods))
+    derived = DerivedMetrics()
+    clock = BmsClockModel()
 
     logging.basicConfig(level=logging.DEBUG)
 
     csv_file = open("bms_data.csv", "w")
     writer = csv.writer(csv_file)
 
-    title_line = [param.name for param in running_params_scalar]
+    title_line = ["HostTime", "Monotonic", "BmsTime"]
+    title_line += [param.name for param in running_params_scalar]
     title_line += [f"CellTemperature{i}" for i in range(1, 4)]
     title_line += [
         "DischargeFetTemperature",
@@ -40,19 +62,43 @@ def main():
         "CurrentCycleCharged",
     ]
     title_line += [f"Cell{i}Voltage" for i in range(1, 17)]
+    title_line += list(derived.values().keys())
 
     writer.writerow(title_line)
 
     while True:
-        data_line = []
+        fresh = scheduler.poll()
+        if fresh:
+            # every value is stamped with its own receive time
+            receive_times = {
+                parameter: scheduler.timestamps[parameter][0] for parameter in fresh
+            }
+            if BmsParameterId.RtcTime in fresh:
+                clock.add(
+                    receive_times[BmsParameterId.RtcTime],
+                    fresh[BmsParameterId.RtcTime],
+                )
+            derived.update_all(fresh, receive_times)
+
+        values = scheduler.values
+        if len(values) < len(poll_periods):
+            time.sleep(1)
+            continue
+
+        monotonic, wall_time = scheduler.timestamps[BmsParameterId.BatteryVoltage]
+        data_line = [
+            datetime.fromtimestamp(wall_time).isoformat(),
+            f"{monotonic:.3f}",
+            clock.bms_time(monotonic).isoformat(timespec="milliseconds"),
+        ]
         for param in running_params_scalar:
-            param_value = bms_comm.read_parameter(param)
+            param_value = values[param]
             if type(param_value) is datetime:
                 data_line.append(param_value.isoformat())
             else:
                 data_line.append(param_value)
 
-        temperatures = bms_comm.read_parameter(BmsParameterId.Temperatures)
+        temperatures = values[BmsParameterId.Temperatures]
         for temp in temperatures["cell_temperatures"]:
             data_line.append(temp)
 
@@ -60,11 +106,12 @@ def main():
         data_line.append(temperatures["charge_fet"])
         data_line.append(temperatures["soft_start_circuit"])
 
-        statistics = bms_comm.read_parameter(BmsParameterId.Statistics)
+        statistics = values[BmsParameterId.Statistics]
         data_line.append(statistics["lifetime_charged"])
         data_line.append(statistics["current_cycle"])
 
-        data_line += bms_comm.read_parameter(BmsParameterId.CellVoltages1)
+        data_line += values[BmsParameterId.CellVoltages1]
+        data_line += derived.values().values()
 
         writer.writerow(data_line)
         csv_file.flush()
@@ -0,0 +1,46 @@
+from surron_bms_communication import SurronBmsCommunication
+from bms_poll_scheduler import BmsPollScheduler
+from surron_communication import SurronCommunication
+from bms_deadband_log import DeadbandRecorder
+from serial_communication import open_serial
+from bms_params import BmsParameterId
+import logging
+import sys
+import time
+
+
+poll_periods = {
+    BmsParameterId.BatteryVoltage: 1.0,
+    BmsParameterId.BatteryCurrent: 1.0,
+    BmsParameterId.CellVoltages1: 1.0,
+    BmsParameterId.Temperatures: 5.0,
+    BmsParameterId.BatteryPercent: 10.0,
+    BmsParameterId.RemainingCapacity: 10.0,
+    BmsParameterId.Statistics: 10.0,
+    BmsParameterId.BatteryHealth: 600.0,
+    BmsParameterId.TotalCapacity: 600.0,
+    BmsParameterId.ChargeCycles: 600.0,
+}
+
+
+def main():
+    port = sys.argv[1] if len(sys.argv) > 1 else "/dev/ttyUSB0"
+    path = sys.argv[2] if len(sys.argv) > 2 else "bms_data_deadband.csv"
+
+    comm = SurronCommunication(serial=open_serial(port))
+    bms_comm = SurronBmsCommunication(comm)
+    scheduler = BmsPollScheduler(bms_comm, poll_periods, max_batch=len(poll_periods))
+
+    logging.basicConfig(level=logging.DEBUG)
+
+    with DeadbandRecorder(path) as recorder:
+        while True:
+            timestamp = time.time()
+            for param, value in scheduler.poll().items():
+                recorder.record(param, value, timestamp)
+
+            time.sleep(scheduler.time_until_due())
+
+
+if __name__ == "__main__":
+    main()
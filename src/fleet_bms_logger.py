@@ -0,0 +1,193 @@
+from surron_bms_communication import SurronBmsCommunication
+from surron_communication import SurronCommunication
+from serial_communication import open_serial
+from bms_params import BmsParameterId
+from typing import Optional
+import argparse
+import bms_params
+import csv
+import logging
+import multiprocessing
+import queue
+import time
+
+fleet_params = [
+    BmsParameterId.BatteryVoltage,
+    BmsParameterId.BatteryCurrent,
+    BmsParameterId.BatteryPercent,
+    BmsParameterId.RemainingCapacity,
+    BmsParameterId.Temperatures,
+    BmsParameterId.CellVoltages1,
+]
+
+STATS_INTERVAL = 10.0
+
+
+def get_columns(params: list[BmsParameterId]) -> list[str]:
+    columns = ["Timestamp", "Port"]
+    for param in params:
+        try:
+            sample = bms_params.decode_bms_data(param, bytes(param.length))
+        except ValueError:
+            # dates can't be decoded from zeros, they are a single column anyway
+            sample = None
+        columns += bms_params.flatten_bms_data(param, sample).keys()
+    return columns
+
+
+def worker(
+    port: str,
+    params: list[BmsParameterId],
+    interval: float,
+    rows: multiprocessing.Queue,
+):
+    # one process per port since pyserial blocks, rows and stats go to the parent
+    comm = SurronCommunication(serial=open_serial(port))
+    bms_comm = SurronBmsCommunication(comm)
+    row_count = 0
+    last_stats = time.monotonic()
+
+    while True:
+        cycle_start = time.monotonic()
+        values = bms_comm.read_parameters(params)
+
+        row = {"Timestamp": f"{time.time():.3f}", "Port": port}
+        for param, value in values.items():
+            if value is not None:
+                row.update(bms_params.flatten_bms_data(param, value))
+        rows.put(("row", port, row))
+        row_count += 1
+
+        now = time.monotonic()
+        if now - last_stats >= STATS_INTERVAL:
+            stats = dict(comm.metrics.counters)
+            stats["rows"] = row_count
+            stats["rows_per_sec"] = row_count / (now - last_stats)
+            rows.put(("stats", port, stats))
+            row_count = 0
+            last_stats = now
+
+        time.sleep(max(interval - (time.monotonic() - cycle_start), 0))
+
+
+class FleetSupervisor:
+    def __init__(
+        self,
+        ports: list[str],
+        output: str,
+        params: list[BmsParameterId] = fleet_params,
+        interval: float = 1.0,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+    ):
+        self.ports = ports
+        self.params = params
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = multiprocessing.Queue()
+        self.processes: dict[str, Optional[multiprocessing.Process]] = {
+            port: None for port in ports
+        }
+        self.restarts = {port: 0 for port in ports}
+        # restarts since the last row, for the backoff
+        self.failures = {port: 0 for port in ports}
+        self.restart_at = {port: 0.0 for port in ports}
+        self.health: dict[str, dict] = {port: {} for port in ports}
+        self.last_row: dict[str, float] = {}
+
+        self.csv_file = open(output, "w", newline="")
+        self.writer = csv.DictWriter(
+            self.csv_file, get_columns(params), restval="", extrasaction="ignore"
+        )
+        self.writer.writeheader()
+
+    def start_worker(self, port: str):
+        process = multiprocessing.Process(
+            target=worker,
+            args=(port, self.params, self.interval, self.rows),
+            name=f"bms-{port}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[port] = process
+
+    def supervise(self):
+        now = time.monotonic()
+        for port, process in self.processes.items():
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                # restart with backoff so a missing adapter doesn't spin
+                self.restarts[port] += 1
+                self.failures[port] += 1
+                delay = min(2 ** self.failures[port], 60)
+                logging.warning(
+                    f"{port}: Worker exited with {process.exitcode}, restarting in {delay}s"
+                )
+                self.restart_at[port] = now + delay
+                self.processes[port] = None
+            if now >= self.restart_at[port]:
+                self.start_worker(port)
+
+    def report(self):
+        for port in self.ports:
+            stats = self.health[port]
+            if port in self.last_row:
+                last_row = f"{time.time() - self.last_row[port]:.0f}s ago"
+            else:
+                last_row = "never"
+            logging.info(
+                f"{port}: {stats.get('rows_per_sec', 0.0):.2f} rows/s, "
+                f"{stats.get('failed_reads', 0)} failed reads, "
+                f"{stats.get('timeouts', 0)} timeouts, "
+                f"{self.restarts[port]} restarts, last row {last_row}"
+            )
+
+    def run(self):
+        batch = []
+        last_flush = time.monotonic()
+        last_report = time.monotonic()
+
+        while True:
+            self.supervise()
+
+            try:
+                kind, port, data = self.rows.get(timeout=0.5)
+                if kind == "row":
+                    batch.append(data)
+                    self.last_row[port] = time.time()
+                    self.failures[port] = 0
+                else:
+                    self.health[port] = data
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            if len(batch) >= self.batch_size or (
+                batch and now - last_flush >= self.flush_interval
+            ):
+                self.writer.writerows(batch)
+                self.csv_file.flush()
+                batch.clear()
+                last_flush = now
+
+            if now - last_report >= STATS_INTERVAL:
+                self.report()
+                last_report = now
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log several BMS at once")
+    parser.add_argument("ports", nargs="+", help="serial ports, or 'simulated'")
+    parser.add_argument("--output", default="fleet_bms_data.csv")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds per row")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    FleetSupervisor(args.ports, args.output, interval=args.interval).run()
+
+
+if __name__ == "__main__":
+    main()
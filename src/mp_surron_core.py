@@ -0,0 +1,331 @@
+# Protocol core for MicroPython: no dataclasses, enums or typing, and nothing is
+# allocated per frame. Frames are parsed and checksummed in a fixed RX buffer and
+# decoded from there, the request frame is packed into a fixed TX buffer.
+# Under CPython machine.UART is replaced by StubUart, so this can be tested on
+# the host against the SimulatedBms.
+import struct
+import time
+
+try:
+    from micropython import const
+except ImportError:
+
+    def const(value):
+        return value
+
+
+try:
+    from machine import UART
+except ImportError:
+    UART = None
+
+try:
+    from time import sleep_ms, ticks_add, ticks_diff, ticks_ms
+except ImportError:
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(end, start):
+        return end - start
+
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+
+
+CMD_READ_REQUEST = const(0x46)
+CMD_READ_RESPONSE = const(0x47)
+CMD_STATUS = const(0x57)
+
+BMS_ADDRESS = const(0x116)
+SURRON_BAUDRATE = const(9600)
+
+# the BmsParameterId values needed on the device
+PARAM_TEMPERATURES = const(8)
+PARAM_BATTERY_VOLTAGE = const(9)
+PARAM_BATTERY_CURRENT = const(10)
+PARAM_BATTERY_PERCENT = const(13)
+PARAM_REMAINING_CAPACITY = const(15)
+PARAM_CELL_VOLTAGES_1 = const(36)
+
+HEADER_LENGTH = const(5)
+# the longest known register is 64 bytes, anything longer is a stray byte that
+# happens to look like a command
+MAX_DATA_LENGTH = const(128)
+# header, up to 255 data bytes, checksum
+MAX_FRAME_LENGTH = const(261)
+REQUEST_LENGTH = const(6)
+
+
+class StubUart:
+    # machine.UART stand-in for CPython, responder gets every written frame and
+    # returns the bytes to receive in reply
+    def __init__(self, responder=None):
+        self.responder = responder
+        self.pending = bytearray()
+        self.written = bytearray()
+
+    def feed(self, data):
+        self.pending += data
+
+    def any(self):
+        return len(self.pending)
+
+    def readinto(self, buf, nbytes=None):
+        count = min(len(self.pending), len(buf) if nbytes is None else nbytes)
+        if count == 0:
+            return None
+        buf[:count] = self.pending[:count]
+        del self.pending[:count]
+        return count
+
+    def write(self, buf):
+        self.written += buf
+        if self.responder is not None:
+            self.feed(self.responder(bytes(buf)))
+        return len(buf)
+
+    def sendbreak(self):
+        pass
+
+
+def open_uart(uart_id=0, tx=3, rx=4):
+    # RX is inverted like in mp_test_send, a StubUart without machine.UART
+    if UART is None:
+        return StubUart()
+    uart = UART(uart_id, tx=tx, rx=rx)
+    uart.init(
+        baudrate=SURRON_BAUDRATE,
+        bits=8,
+        parity=None,
+        stop=1,
+        timeout=0,
+        invert=UART.INV_RX,
+    )
+    return uart
+
+
+class UartCommunication:
+    # transport with the same role as SerialCommunication, reads never block
+    def __init__(self, uart, chunk_size=64):
+        self.uart = uart
+        self.chunk = bytearray(chunk_size)
+
+    def readinto(self, buf, nbytes):
+        if not self.uart.any():
+            return 0
+        return self.uart.readinto(buf, nbytes) or 0
+
+    def write(self, buf):
+        self.uart.write(buf)
+
+    def reset_input_buffer(self):
+        while self.readinto(self.chunk, len(self.chunk)):
+            pass
+
+    def send_break(self):
+        self.uart.sendbreak()
+
+
+class SurronCore:
+    # After receive() or read_register() succeeded the last frame's fields are
+    # in command/address/parameter/data_length and its data is at
+    # rx[data_offset:data_offset + data_length], valid until the next receive.
+    def __init__(self, transport, rx_size=2 * MAX_FRAME_LENGTH):
+        self.transport = transport
+        self.rx = bytearray(rx_size)
+        self.rx_start = 0
+        self.rx_end = 0
+        self.chunk = bytearray(64)
+        self.tx = bytearray(REQUEST_LENGTH)
+
+        self.command = 0
+        self.address = 0
+        self.parameter = 0
+        self.data_length = 0
+        self.data_offset = 0
+
+        self.requests = 0
+        self.failed_reads = 0
+        self.discarded_bytes = 0
+        self.checksum_errors = 0
+        self.resyncs = 0
+
+    def _fill(self):
+        # moves unparsed bytes to the front when the next chunk wouldn't fit
+        rx = self.rx
+        if self.rx_start == self.rx_end:
+            self.rx_start = self.rx_end = 0
+        elif self.rx_end + len(self.chunk) > len(rx):
+            length = self.rx_end - self.rx_start
+            for i in range(length):
+                rx[i] = rx[self.rx_start + i]
+            self.rx_start = 0
+            self.rx_end = length
+
+        # never more than fits, bytes read from the UART can't be put back
+        free = min(len(self.chunk), len(rx) - self.rx_end)
+        if free == 0:
+            return 0
+        count = self.transport.readinto(self.chunk, free)
+        chunk = self.chunk
+        end = self.rx_end
+        for i in range(count):
+            rx[end + i] = chunk[i]
+        self.rx_end = end + count
+        return count
+
+    def _parse(self):
+        rx = self.rx
+        while self.rx_end - self.rx_start >= HEADER_LENGTH:
+            start = self.rx_start
+            command = rx[start]
+            length_byte = rx[start + 4]
+            if command == CMD_READ_REQUEST:
+                length = REQUEST_LENGTH
+            elif command == CMD_READ_RESPONSE and length_byte <= MAX_DATA_LENGTH:
+                length = HEADER_LENGTH + length_byte + 1
+            elif command == CMD_STATUS and 0 < length_byte <= MAX_DATA_LENGTH + 1:
+                # Status counts one byte more than it carries
+                length = HEADER_LENGTH + length_byte
+            else:
+                self.rx_start += 1
+                self.discarded_bytes += 1
+                continue
+
+            if self.rx_end - start < length:
+                return False
+
+            checksum = 0
+            for i in range(start, start + length - 1):
+                checksum += rx[i]
+            if checksum & 0xFF != rx[start + length - 1]:
+                # resync on the next byte
+                self.rx_start += 1
+                self.checksum_errors += 1
+                continue
+
+            self.command = command
+            self.address = rx[start + 1] | rx[start + 2] << 8
+            self.parameter = rx[start + 3]
+            self.data_length = length - REQUEST_LENGTH
+            self.data_offset = start + HEADER_LENGTH
+            self.rx_start = start + length
+            return True
+        return False
+
+    def receive(self, timeout_ms):
+        deadline = ticks_add(ticks_ms(), timeout_ms)
+        while True:
+            if self._parse():
+                return True
+            if self._fill():
+                continue
+            if ticks_diff(deadline, ticks_ms()) <= 0:
+                return self._drop_partial_frame()
+            sleep_ms(1)
+
+    def _drop_partial_frame(self):
+        # Nothing more arrives for the frame at the start of the buffer, so its
+        # command byte was most likely a stray one: skip it and look for a
+        # complete frame behind it.
+        if self.rx_end == self.rx_start:
+            return False
+        self.resyncs += 1
+        while self.rx_end > self.rx_start:
+            self.rx_start += 1
+            self.discarded_bytes += 1
+            if self._parse():
+                return True
+        return False
+
+    def send_read_request(self, address, parameter, length):
+        tx = self.tx
+        struct.pack_into("<BHBB", tx, 0, CMD_READ_REQUEST, address, parameter, length)
+        tx[5] = (tx[0] + tx[1] + tx[2] + tx[3] + tx[4]) & 0xFF
+        self.transport.write(tx)
+        self.requests += 1
+
+    def read_register(self, address, parameter, length, timeout_ms=200, trials=3):
+        for trial in range(trials):
+            self.transport.reset_input_buffer()
+            self.rx_start = self.rx_end = 0
+            self.send_read_request(address, parameter, length)
+
+            deadline = ticks_add(ticks_ms(), timeout_ms)
+            while True:
+                remaining = ticks_diff(deadline, ticks_ms())
+                if remaining <= 0 or not self.receive(remaining):
+                    break
+                if (
+                    self.command == CMD_READ_RESPONSE
+                    and self.address == address
+                    and self.parameter == parameter
+                    and self.data_length == length
+                ):
+                    return True
+
+            # can not be too high or else BMS goes back into standby (after ~3s)
+            sleep_ms(20 << trial if trial < 3 else 100)
+        self.failed_reads += 1
+        return False
+
+    # Decoding straight from the RX buffer. The integer helpers don't allocate as
+    # long as the value fits a small int, unpack() returns a tuple.
+    def uint8(self, index=0):
+        return self.rx[self.data_offset + index]
+
+    def int8(self, index=0):
+        value = self.rx[self.data_offset + index]
+        return value - 256 if value > 127 else value
+
+    def uint16(self, index=0):
+        offset = self.data_offset + 2 * index
+        return self.rx[offset] | self.rx[offset + 1] << 8
+
+    def uint32(self, index=0):
+        offset = self.data_offset + 4 * index
+        rx = self.rx
+        return (
+            rx[offset]
+            | rx[offset + 1] << 8
+            | rx[offset + 2] << 16
+            | rx[offset + 3] << 24
+        )
+
+    def int32(self, index=0):
+        value = self.uint32(index)
+        return value - 0x100000000 if value & 0x80000000 else value
+
+    def unpack(self, fmt):
+        return struct.unpack_from(fmt, self.rx, self.data_offset)
+
+
+def main():
+    # reads the basic values once a second, against the SimulatedBms on CPython
+    if UART is None:
+        from simulated_bms import SimulatedBms
+
+        bms = SimulatedBms()
+        uart = StubUart(lambda data: b"".join(frame for _, frame in bms.receive(data)))
+    else:
+        uart = open_uart()
+
+    core = SurronCore(UartCommunication(uart))
+    while True:
+        if core.read_register(BMS_ADDRESS, PARAM_BATTERY_VOLTAGE, 4):
+            print("voltage mV", core.uint32())
+        if core.read_register(BMS_ADDRESS, PARAM_BATTERY_CURRENT, 4):
+            print("current mA", core.int32())
+        if core.read_register(BMS_ADDRESS, PARAM_CELL_VOLTAGES_1, 32):
+            print("cells mV", [core.uint16(i) for i in range(16)])
+        if core.read_register(BMS_ADDRESS, PARAM_TEMPERATURES, 8):
+            print("fet temperatures", core.int8(4), core.int8(5))
+        sleep_ms(1000)
+
+
+if __name__ == "__main__":
+    main()
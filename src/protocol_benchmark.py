@@ -0,0 +1,227 @@
+from bms_params import BmsParameterId, BMS_ADDRESS
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_bms_communication import SurronBmsCommunication
+from surron_cmd import SurronCmd
+from surron_communication import SurronCommunication
+from surron_data_packet import SurronDataPacket
+from typing import Callable
+import argparse
+import bms_params
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# csv_bms_logger reads these every row
+POLL_CYCLE_PARAMS = [
+    BmsParameterId.RtcTime,
+    BmsParameterId.BatteryVoltage,
+    BmsParameterId.BatteryCurrent,
+    BmsParameterId.BatteryPercent,
+    BmsParameterId.BatteryHealth,
+    BmsParameterId.RemainingCapacity,
+    BmsParameterId.TotalCapacity,
+    BmsParameterId.ChargeCycles,
+    BmsParameterId.Temperatures,
+    BmsParameterId.Statistics,
+    BmsParameterId.CellVoltages1,
+]
+
+
+class ReplaySerial:
+    # serves the same frames over and over without any timing, for receive_packet
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    def read(self, length: int, timeout: float) -> bytes:
+        if self.position >= len(self.data):
+            self.position = 0
+        chunk = self.data[self.position : self.position + length]
+        self.position += len(chunk)
+        return chunk
+
+    def write(self, data: bytes):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def send_break(self, duration: float = 0.01):
+        pass
+
+    def reset(self):
+        pass
+
+
+def measure(func: Callable[[], object], duration: float) -> dict:
+    # ops/sec over roughly `duration` seconds, then allocations with tracemalloc:
+    # blocks still alive per call (i.e. the result objects) and the transient peak
+    iterations = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            func()
+        iterations += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            break
+        batch = min(batch * 2, 10000)
+
+    calls = min(iterations, 1000)
+    results = [None] * calls
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for i in range(calls):
+        results[i] = func()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    return {
+        "ops_per_sec": iterations / elapsed,
+        "retained_blocks_per_call": (blocks_after - blocks_before) / calls,
+        "retained_bytes_per_call": (current - baseline) / calls,
+        "peak_bytes_per_call": (peak - baseline) / calls,
+    }
+
+
+def benchmark_packets(duration: float) -> dict:
+    parameter = BmsParameterId.CellVoltages1
+    response = SurronDataPacket.create(
+        SurronCmd.ReadResponse,
+        BMS_ADDRESS,
+        parameter.value,
+        parameter.length,
+        bytes(range(parameter.length)),
+    )
+    request = SurronDataPacket.create(
+        SurronCmd.ReadRequest, BMS_ADDRESS, parameter.value, parameter.length, None
+    )
+    frame = response.to_bytes()
+    header = frame[: SurronDataPacket.HEADER_LENGTH]
+
+    return {
+        "to_bytes.ReadRequest": measure(request.to_bytes, duration),
+        "to_bytes.ReadResponse": measure(response.to_bytes, duration),
+        "from_bytes.ReadResponse": measure(
+            lambda: SurronDataPacket.from_bytes(frame), duration
+        ),
+        "calc_checksum": measure(
+            lambda: SurronDataPacket.calc_checksum(frame[:-1]), duration
+        ),
+        "read_header": measure(lambda: SurronDataPacket.read_header(header), duration),
+    }
+
+
+def benchmark_decode(duration: float) -> dict:
+    simulated = SimulatedBms()
+    results = {}
+    for parameter in BmsParameterId:
+        data = simulated.register_value(parameter)
+        results[f"decode_bms_data.{parameter.name}"] = measure(
+            lambda: bms_params.decode_bms_data(parameter, data), duration
+        )
+    return results
+
+
+def benchmark_receive(duration: float) -> dict:
+    frames = b"".join(
+        SurronDataPacket.create(
+            SurronCmd.ReadResponse,
+            BMS_ADDRESS,
+            parameter.value,
+            parameter.length,
+            bytes(parameter.length),
+        ).to_bytes()
+        for parameter in POLL_CYCLE_PARAMS
+    )
+    comm = SurronCommunication(ReplaySerial(frames))
+    return {"receive_packet": measure(lambda: comm.receive_packet(1.0), duration)}
+
+
+def benchmark_poll_cycle(duration: float, latency: float) -> dict:
+    # full csv_bms_logger row against the simulated BMS on a 9600 baud link
+    results = {}
+    for name, read_row in (
+        ("sequential", lambda bms: [bms.read_parameter(p) for p in POLL_CYCLE_PARAMS]),
+        ("pipelined", lambda bms: bms.read_parameters(POLL_CYCLE_PARAMS)),
+    ):
+        serial = SimulatedSerialCommunication(SimulatedBms(latency=latency))
+        bms_comm = SurronBmsCommunication(SurronCommunication(serial))
+        cycles = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            read_row(bms_comm)
+            cycles += 1
+        elapsed = time.perf_counter() - start
+        results[f"poll_cycle.{name}"] = {
+            "cycles_per_sec": cycles / elapsed,
+            "seconds_per_cycle": elapsed / cycles,
+            "registers_per_cycle": len(POLL_CYCLE_PARAMS),
+        }
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(old: dict, new: dict):
+    for name, new_result in new["results"].items():
+        old_result = old["results"].get(name)
+        if old_result is None:
+            continue
+        for metric in ("ops_per_sec", "cycles_per_sec"):
+            if metric in new_result and metric in old_result:
+                change = new_result[metric] / old_result[metric] - 1
+                print(f"{name} {metric}: {change * 100:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surron protocol benchmarks")
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds per case")
+    parser.add_argument("--poll-duration", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="BMS latency")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    results = {}
+    results.update(benchmark_packets(args.duration))
+    results.update(benchmark_decode(args.duration))
+    results.update(benchmark_receive(args.duration))
+    results.update(benchmark_poll_cycle(args.poll_duration, args.latency))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as old:
+            compare(json.load(old), report)
+
+
+if __name__ == "__main__":
+    main()
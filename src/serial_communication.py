@@ -1,29 +1,90 @@
+import logging
 import serial
+import time
 
 SURRON_BAUDRATE = 9600
 
 
 class SerialCommunication:
-    def __init__(self, port: str):
+    def __init__(
+        self, port: str, reconnect_delay: float = 0.1, max_reconnect_delay: float = 5.0
+    ):
         self.port = port
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reconnects = 0
         self.serial = serial.Serial(port, SURRON_BAUDRATE, timeout=1)
 
     def read(self, length: int, timeout: float) -> bytes:
-        self.serial.timeout = timeout
-        return self.serial.read(length)
+        try:
+            self.serial.timeout = timeout
+            return self.serial.read(length)
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Read failed ({e}), reconnecting")
+            self.reconnect()
+            return b""
 
     def write(self, data: bytes):
-        self.serial.write(data)
-        self.serial.flush()
+        try:
+            self.serial.write(data)
+            self.serial.flush()
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Write failed ({e}), reconnecting")
+            self.reconnect()
+            self.serial.write(data)
+            self.serial.flush()
 
     def reset_input_buffer(self):
-        self.serial.reset_input_buffer()
+        try:
+            self.serial.reset_input_buffer()
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Reset failed ({e}), reconnecting")
+            self.reconnect()
+
+    def send_break(self, duration: float = 0.01):
+        try:
+            self.serial.send_break(duration)
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Break failed ({e}), reconnecting")
+            self.reconnect()
 
     def close(self):
         self.serial.close()
 
     def reset(self):
-        self.serial.reset_input_buffer()
-        self.serial.reset_output_buffer()
-        self.serial.close()
-        self.serial.open()
+        try:
+            self.serial.reset_input_buffer()
+            self.serial.reset_output_buffer()
+            self.serial.close()
+            self.serial.open()
+        except serial.SerialException as e:
+            logging.warning(f"{self.port}: Reopening failed ({e}), reconnecting")
+            self.reconnect()
+
+    def reconnect(self):
+        # blocks until the device is back, e.g. after the USB adapter was replugged
+        delay = self.reconnect_delay
+        while True:
+            try:
+                self.serial.close()
+                self.serial.open()
+                self.reconnects += 1
+                logging.info(f"{self.port}: Reconnected")
+                return
+            except serial.SerialException as e:
+                logging.warning(
+                    f"{self.port}: Reconnect failed ({e}), retry in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+
+def open_serial(port: str) -> SerialCommunication:
+    # "simulated" instead of a device path runs against the built-in fake BMS,
+    # which has the same interface. Imported here so the entry points don't
+    # load the simulator for real ports.
+    if port == "simulated":
+        from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+
+        return SimulatedSerialCommunication(SimulatedBms())
+    return SerialCommunication(port)
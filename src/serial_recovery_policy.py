@@ -0,0 +1,34 @@
+from enum import Enum
+
+
+class RecoveryTier(Enum):
+    Drain = 1
+    Break = 2
+    Reopen = 3
+
+
+class SerialRecoveryPolicy:
+    # Escalates with consecutive failed receives: first only drain the input,
+    # then send a break to get the bus back to idle, and only reopen the port
+    # (slow, may re-enumerate USB adapters) if that didn't help either.
+    def __init__(self, break_after: int = 2, reopen_after: int = 4):
+        self.break_after = break_after
+        self.reopen_after = reopen_after
+        self.consecutive_failures = 0
+        self.tier_counts = {tier: 0 for tier in RecoveryTier}
+
+    def on_success(self):
+        self.consecutive_failures = 0
+
+    def on_failure(self) -> RecoveryTier:
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.reopen_after:
+            tier = RecoveryTier.Reopen
+            # start over with the cheap tiers after a reopen
+            self.consecutive_failures = 0
+        elif self.consecutive_failures >= self.break_after:
+            tier = RecoveryTier.Break
+        else:
+            tier = RecoveryTier.Drain
+        self.tier_counts[tier] += 1
+        return tier
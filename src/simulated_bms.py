@@ -0,0 +1,252 @@
+from bms_params import BmsParameterId, BMS_ADDRESS
+import bms_params
+from serial_communication import SURRON_BAUDRATE
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket
+from surron_frame_parser import SurronFrameParser
+from collections import deque
+from datetime import datetime
+from typing import Optional
+import os
+import random
+import struct
+import threading
+import time
+
+
+def default_register_values() -> dict[BmsParameterId, bytes]:
+    values = {
+        BmsParameterId.Temperatures: bytes([25, 26, 25, 0, 30, 31, 28, 0]),
+        BmsParameterId.BatteryVoltage: struct.pack("<I", 64000),
+        BmsParameterId.BatteryCurrent: struct.pack("<i", -1500),
+        BmsParameterId.BatteryPercent: bytes([80]),
+        BmsParameterId.BatteryHealth: bytes([100, 0, 0, 0]),
+        BmsParameterId.RemainingCapacity: struct.pack("<I", 25600),
+        BmsParameterId.TotalCapacity: struct.pack("<I", 32000),
+        BmsParameterId.Statistics: struct.pack("<3I", 32000, 1234000, 6400),
+        BmsParameterId.ChargeCycles: struct.pack("<I", 42),
+        BmsParameterId.DesignedCapacity: struct.pack("<I", 32000),
+        BmsParameterId.DesignedVoltage: struct.pack("<I", 60000),
+        BmsParameterId.Versions: bytes([3, 1, 2, 1]) + b"A001",
+        BmsParameterId.ManufacturingDate: bytes([21, 6, 15]),
+        BmsParameterId.BmsManufacturer: b"SIMULATED".ljust(16),
+        BmsParameterId.BatteryModel: b"SIMULATED 60V 32AH".ljust(32),
+        BmsParameterId.CellType: b"SIM 21700".ljust(16),
+        BmsParameterId.SerialNumber: b"SIM0000000001".ljust(32),
+        BmsParameterId.CellVoltages1: struct.pack(
+            "<16H", *(3990 + i % 5 for i in range(16))
+        ),
+        BmsParameterId.CellVoltages2: bytes(32),
+        BmsParameterId.History: struct.pack(
+            "<iiHHbb", 120000, 30000, 4200, 3100, 45, 5
+        ),
+    }
+    for parameter in BmsParameterId:
+        values.setdefault(parameter, bytes(parameter.length))
+    return values
+
+
+class SimulatedBms:
+    # Answers ReadRequests for BMS_ADDRESS like the real BMS and can inject the
+    # faults we see on the real bus: response latency/jitter, dropped bytes,
+    # broken checksums, missing responses and unsolicited Status packets.
+    def __init__(
+        self,
+        latency: float = 0.01,
+        jitter: float = 0.0,
+        drop_byte_rate: float = 0.0,
+        checksum_error_rate: float = 0.0,
+        no_response_rate: float = 0.0,
+        status_interval: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_byte_rate = drop_byte_rate
+        self.checksum_error_rate = checksum_error_rate
+        self.no_response_rate = no_response_rate
+        self.status_interval = status_interval
+        self.random = random.Random(seed)
+        self.values = default_register_values()
+        self.parser = SurronFrameParser()
+        self.requests = 0
+
+    def set_value(self, parameter: BmsParameterId, data: bytes):
+        if len(data) != parameter.length:
+            raise ValueError(f"{parameter.name} must be {parameter.length} bytes long")
+        self.values[parameter] = data
+
+    def register_value(self, parameter: BmsParameterId) -> bytes:
+        if parameter == BmsParameterId.RtcTime:
+            now = datetime.now()
+            return bytes(
+                [now.year - 2000, now.month, now.day, now.hour, now.minute, now.second]
+            )
+        return self.values[parameter]
+
+    def receive(self, data: bytes) -> list[tuple[float, bytes]]:
+        # returns (delay, frame) for every response the received bytes trigger
+        self.parser.feed(data)
+        responses = []
+        for packet in self.parser.packets():
+            if packet.command != SurronCmd.ReadRequest or packet.address != BMS_ADDRESS:
+                continue
+            self.requests += 1
+            response = self.response(packet)
+            if response is not None:
+                delay = self.latency + self.random.uniform(0, self.jitter)
+                responses.append((delay, response))
+        return responses
+
+    def response(self, request: SurronDataPacket) -> Optional[bytes]:
+        if self.random.random() < self.no_response_rate:
+            return None
+
+        parameter = bms_params.get_parameter(request.parameter)
+        if parameter is None:
+            data = bytes(request.data_length)
+        else:
+            data = self.register_value(parameter)[: request.data_length]
+            data = data.ljust(request.data_length, b"\x00")
+
+        frame = bytearray(
+            SurronDataPacket.create(
+                SurronCmd.ReadResponse,
+                request.address,
+                request.parameter,
+                request.data_length,
+                data,
+            ).to_bytes()
+        )
+        return self.inject_errors(frame)
+
+    def status_frame(self) -> bytes:
+        parameter = self.random.choice(
+            [BmsParameterId.BatteryVoltage, BmsParameterId.BatteryCurrent]
+        )
+        return SurronDataPacket.create(
+            SurronCmd.Status,
+            BMS_ADDRESS,
+            parameter.value,
+            parameter.length,
+            self.register_value(parameter),
+        ).to_bytes()
+
+    def inject_errors(self, frame: bytearray) -> bytes:
+        if self.random.random() < self.checksum_error_rate:
+            frame[-1] ^= 0xFF
+        if self.random.random() < self.drop_byte_rate:
+            del frame[self.random.randrange(len(frame))]
+        return bytes(frame)
+
+
+class SimulatedSerialCommunication:
+    # Drop-in replacement for SerialCommunication that talks to a SimulatedBms.
+    # Bytes arrive at the given baud rate in real time, so timeouts and
+    # throughput behave like on the real bus.
+    def __init__(self, bms: SimulatedBms, baudrate: int = SURRON_BAUDRATE):
+        self.port = "simulated"
+        self.bms = bms
+        self.byte_time = 10 / baudrate  # 8N1
+        # (time the first byte is on the wire, frame)
+        self.frames: deque[tuple[float, bytes]] = deque()
+        self.wire_free_at = 0.0
+        self.next_status = time.monotonic()
+
+    def _schedule(self, start: float, frame: bytes):
+        start = max(start, self.wire_free_at)
+        self.wire_free_at = start + len(frame) * self.byte_time
+        self.frames.append((start, frame))
+
+    def _inject_status(self, now: float):
+        if self.bms.status_interval is None:
+            return
+        while self.next_status <= now:
+            self._schedule(self.next_status, self.bms.status_frame())
+            self.next_status += self.bms.status_interval
+
+    def _available(self, now: float) -> int:
+        available = 0
+        for start, frame in self.frames:
+            received = int((now - start) / self.byte_time)
+            if received <= 0:
+                break
+            available += min(received, len(frame))
+            if received < len(frame):
+                break
+        return available
+
+    def _take(self, length: int) -> bytes:
+        data = bytearray()
+        while self.frames and len(data) < length:
+            start, frame = self.frames.popleft()
+            missing = length - len(data)
+            data += frame[:missing]
+            if len(frame) > missing:
+                self.frames.appendleft(
+                    (start + missing * self.byte_time, frame[missing:])
+                )
+        return bytes(data)
+
+    def read(self, length: int, timeout: float) -> bytes:
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.monotonic()
+            self._inject_status(now)
+            available = self._available(now)
+            if available >= length or now >= deadline:
+                return self._take(min(available, length))
+            time.sleep(min(self.byte_time, deadline - now))
+
+    def write(self, data: bytes):
+        # like SerialCommunication.write, returns once the data is sent
+        time.sleep(len(data) * self.byte_time)
+        now = time.monotonic()
+        for delay, frame in self.bms.receive(data):
+            self._schedule(now + delay, frame)
+
+    def reset_input_buffer(self):
+        now = time.monotonic()
+        self._inject_status(now)
+        self._take(self._available(now))
+
+    def send_break(self, duration: float = 0.01):
+        time.sleep(duration)
+
+    def close(self):
+        pass
+
+    def reset(self):
+        self.frames.clear()
+
+
+class PtySimulatedBms:
+    # Serves a SimulatedBms on a pseudo terminal so the real pyserial based
+    # SerialCommunication can be used against it: SerialCommunication(pty.port)
+    def __init__(self, bms: SimulatedBms):
+        # POSIX only, so imported here to keep the rest of the module portable
+        import tty
+
+        self.bms = bms
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while self.running:
+            try:
+                data = os.read(self.master, 256)
+            except OSError:
+                break
+            for delay, frame in self.bms.receive(data):
+                time.sleep(delay)
+                os.write(self.master, frame)
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
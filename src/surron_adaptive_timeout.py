@@ -0,0 +1,93 @@
+from collections import deque
+from serial_communication import SURRON_BAUDRATE
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket
+from typing import Tuple
+
+# the BMS goes back into standby if it doesn't see a request for ~3s
+BMS_STANDBY_TIME = 3.0
+
+
+class AdaptiveTimeout:
+    # Learns how long the BMS takes to start answering per (parameter, length) and
+    # derives the receive timeout from a high percentile of that plus the time the
+    # response needs on the wire. Until enough samples are collected the fixed
+    # default_timeout is used.
+    def __init__(
+        self,
+        baudrate: int = SURRON_BAUDRATE,
+        percentile: float = 0.99,
+        margin: float = 0.02,
+        min_timeout: float = 0.03,
+        max_timeout: float = 0.5,
+        default_timeout: float = 0.2,
+        min_samples: int = 10,
+        window: int = 100,
+        trials: int = 3,
+    ):
+        self.baudrate = baudrate
+        self.percentile = percentile
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.default_timeout = default_timeout
+        self.min_samples = min_samples
+        self.window = window
+        self.trials = trials
+        self.samples: dict[Tuple[int, int], deque[float]] = {}
+        self.all_samples: deque[float] = deque(maxlen=window)
+
+        # all trials of one read including backoffs have to fit into the standby time
+        worst_case_backoffs = sum(self.backoff(trial) for trial in range(trials))
+        self.max_timeout = min(
+            max_timeout, (BMS_STANDBY_TIME - worst_case_backoffs) / trials
+        )
+
+    def transmit_time(self, byte_count: int) -> float:
+        # 8N1 = 10 bits per byte
+        return byte_count * 10 / self.baudrate
+
+    def response_transmit_time(self, data_length: int) -> float:
+        return self.transmit_time(
+            SurronDataPacket.get_packet_length(SurronCmd.ReadResponse, data_length)
+        )
+
+    def observe(self, parameter: int, data_length: int, latency: float):
+        # latency from the end of the request to the complete response
+        delay = max(latency - self.response_transmit_time(data_length), 0.0)
+        samples = self.samples.get((parameter, data_length))
+        if samples is None:
+            samples = self.samples[(parameter, data_length)] = deque(maxlen=self.window)
+        samples.append(delay)
+        self.all_samples.append(delay)
+
+    def observe_timeout(self, parameter: int, data_length: int, timeout: float):
+        # A response that didn't arrive within timeout took longer than that, but
+        # how much longer is unknown. Only learning from the responses that made
+        # it would keep the timeout below the slow ones for good, so the timeout
+        # is recorded as a censored sample at twice the delay it allowed. Capped
+        # at default_timeout, a BMS in standby or unplugged must not push every
+        # read to max_timeout.
+        transmit_time = self.response_transmit_time(data_length)
+        delay = max(timeout - transmit_time, 0.0)
+        self.observe(
+            parameter,
+            data_length,
+            min(2 * delay + transmit_time, self.default_timeout),
+        )
+
+    def timeout(self, parameter: int, data_length: int) -> float:
+        samples = self.samples.get((parameter, data_length))
+        if samples is None or len(samples) < self.min_samples:
+            # not enough data for this register, fall back to all registers
+            samples = self.all_samples
+        if len(samples) < self.min_samples:
+            return self.default_timeout
+
+        ordered = sorted(samples)
+        delay = ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+        timeout = delay + self.response_transmit_time(data_length) + self.margin
+        return min(max(timeout, self.min_timeout), self.max_timeout)
+
+    def backoff(self, trial: int) -> float:
+        # short pause before retrying, growing with every failed trial
+        return min(0.02 * 2**trial, 0.1)
@@ -1,20 +1,118 @@
 from typing import Optional
 from bms_params import BmsParameterId
+from bms_parameter_cache import BmsParameterCache, CacheState
 import bms_params
 from surron_communication import SurronCommunication
+import threading
 
 
 class SurronBmsCommunication:
-    def __init__(self, comm: SurronCommunication):
+    def __init__(
+        self, comm: SurronCommunication, cache: Optional[BmsParameterCache] = None
+    ):
         self.comm = comm
+        self.cache = cache
+        # serializes bus access between callers and background cache refreshes
+        self.lock = threading.RLock()
+        # only guards refreshing, so stale hits never wait for the bus
+        self.refresh_lock = threading.Lock()
+        self.refreshing: set[BmsParameterId] = set()
 
     def read_raw_parameter_data(self, parameter: BmsParameterId) -> Optional[bytes]:
-        return self.comm.read_register(
-            bms_params.BMS_ADDRESS,
-            parameter.value,
-            parameter.length,
-        )
+        with self.lock:
+            return self.comm.read_register(
+                bms_params.BMS_ADDRESS,
+                parameter.value,
+                parameter.length,
+            )
 
     def read_parameter(self, parameter: BmsParameterId):
-        data = self.read_raw_parameter_data(parameter)
-        return bms_params.decode_bms_data(parameter, data)
+        if self.cache is None:
+            data = self.read_raw_parameter_data(parameter)
+            return bms_params.decode_bms_data(parameter, data)
+
+        state, value = self.cache.get(parameter)
+        if state == CacheState.Stale:
+            self._refresh_in_background(parameter)
+        if state != CacheState.Miss:
+            return value
+        return self._read_uncached([parameter])[parameter]
+
+    def read_parameters(
+        self,
+        parameters: list[BmsParameterId],
+        receive_times: Optional[dict[BmsParameterId, float]] = None,
+    ) -> dict:
+        # receive_times gets the monotonic time each value read from the bus was
+        # received, cache hits have none
+        if self.cache is None:
+            return self._read_uncached(parameters, receive_times)
+
+        values = {}
+        missing = []
+        for parameter in parameters:
+            state, value = self.cache.get(parameter)
+            if state == CacheState.Stale:
+                self._refresh_in_background(parameter)
+            if state == CacheState.Miss:
+                missing.append(parameter)
+            else:
+                values[parameter] = value
+
+        if missing:
+            values.update(self._read_uncached(missing, receive_times))
+        return {parameter: values[parameter] for parameter in parameters}
+
+    def _read_uncached(
+        self,
+        parameters: list[BmsParameterId],
+        receive_times: Optional[dict[BmsParameterId, float]] = None,
+    ) -> dict:
+        values = {}
+        with self.lock:
+            if self.cache is not None:
+                # another thread may have read them while this one waited for the
+                # bus, concurrent misses then cause a single read
+                for parameter in parameters:
+                    fresh, value = self.cache.peek(parameter)
+                    if fresh:
+                        values[parameter] = value
+            missing = [parameter for parameter in parameters if parameter not in values]
+            if missing:
+                registers = [
+                    (bms_params.BMS_ADDRESS, parameter.value, parameter.length)
+                    for parameter in missing
+                ]
+                register_times = {}
+                results = self.comm.read_registers(
+                    registers, receive_times=register_times
+                )
+                for parameter, register, data in zip(missing, registers, results):
+                    value = (
+                        None
+                        if data is None
+                        else bms_params.decode_bms_data(parameter, data)
+                    )
+                    values[parameter] = value
+                    if value is None:
+                        continue
+                    if receive_times is not None:
+                        receive_times[parameter] = register_times[register]
+                    if self.cache is not None:
+                        self.cache.put(parameter, value, register_times[register])
+        return {parameter: values[parameter] for parameter in parameters}
+
+    def _refresh_in_background(self, parameter: BmsParameterId):
+        with self.refresh_lock:
+            if parameter in self.refreshing:
+                return
+            self.refreshing.add(parameter)
+
+        def refresh():
+            try:
+                self._read_uncached([parameter])
+            finally:
+                with self.refresh_lock:
+                    self.refreshing.discard(parameter)
+
+        threading.Thread(target=refresh, daemon=True).start()
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+from bms_params import BmsParameterId
+from surron_data_packet import SurronDataPacket
+
+
+@dataclass
+class SurronBusRecord:
+    timestamp: float
+    packet: SurronDataPacket
+    parameter: Optional[BmsParameterId]
+    value: Any
+
+    def __str__(self) -> str:
+        if self.parameter is None:
+            return f"{self.timestamp:.3f} {self.packet}"
+        return f"{self.timestamp:.3f} {self.parameter.name}: {self.value}"
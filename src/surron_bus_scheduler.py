@@ -0,0 +1,239 @@
+from surron_communication import SurronCommunication
+from surron_protocol import Register
+from surron_metrics import LatencyHistogram
+from serial_communication import open_serial
+from bms_params import BmsParameterId
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import bms_params
+import logging
+import sys
+import threading
+import time
+
+
+@dataclass
+class DeviceStats:
+    polls: int = 0
+    requests: int = 0
+    responses: int = 0
+    failures: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+@dataclass
+class BusDevice:
+    # registers are (parameter, length), all of them are read on every poll of
+    # the device, rate is polls per second, higher priority goes first. Fewer
+    # trials keep a device that stopped answering from hogging the bus.
+    name: str
+    address: int
+    registers: list[tuple[int, int]]
+    rate: float
+    priority: int = 0
+    trials: int = 3
+    next_due: float = 0.0
+    values: dict[int, bytes] = field(default_factory=dict)
+    stats: DeviceStats = field(default_factory=DeviceStats)
+
+    @property
+    def period(self) -> float:
+        return 1.0 / self.rate
+
+
+class SurronBusScheduler:
+    # Owns the one serial line and interleaves polls of several devices on it.
+    # Every request goes through the lock and is sent one at a time, at least
+    # min_gap after the previous exchange ended, so the other devices on the bus,
+    # whose timing we don't know, never see back-to-back requests.
+    # A device that falls more than starvation_periods behind is served before
+    # higher priorities, so a busy bus degrades all devices instead of one.
+    def __init__(
+        self,
+        comm: SurronCommunication,
+        min_gap: float = 0.01,
+        starvation_periods: float = 3.0,
+    ):
+        self.comm = comm
+        self.min_gap = min_gap
+        self.starvation_periods = starvation_periods
+        self.devices: dict[str, BusDevice] = {}
+        self.lock = threading.RLock()
+        self.last_transaction = 0.0
+        self.start_time = time.monotonic()
+
+    def add_device(
+        self,
+        name: str,
+        address: int,
+        registers: list[tuple[int, int]],
+        rate: float,
+        priority: int = 0,
+        trials: int = 3,
+    ) -> BusDevice:
+        device = BusDevice(name, address, registers, rate, priority, trials)
+        self.devices[name] = device
+        return device
+
+    def transact(
+        self,
+        registers: list[Register],
+        trials: int = 3,
+        latencies: Optional[list[float]] = None,
+    ) -> list[Optional[bytes]]:
+        # also for one-off reads from outside the poll loop. The round trips of
+        # the registers answered on their first request go to latencies, retries
+        # and backoffs aren't latency.
+        results = []
+        with self.lock:
+            for register in registers:
+                wait = self.last_transaction + self.min_gap - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                requests = self.comm.metrics.counters["requests"]
+                start = time.monotonic()
+                try:
+                    [data] = self.comm.read_registers(
+                        [register], max_in_flight=1, trials=trials
+                    )
+                finally:
+                    self.last_transaction = time.monotonic()
+                results.append(data)
+                if (
+                    latencies is not None
+                    and data is not None
+                    and self.comm.metrics.counters["requests"] == requests + 1
+                ):
+                    latencies.append(self.last_transaction - start)
+        return results
+
+    def next_device(self, now: float) -> Optional[BusDevice]:
+        due = [device for device in self.devices.values() if device.next_due <= now]
+        if not due:
+            return None
+        return min(
+            due,
+            key=lambda device: (
+                (now - device.next_due) / device.period < self.starvation_periods,
+                -device.priority,
+                device.next_due,
+            ),
+        )
+
+    def poll(self) -> Optional[BusDevice]:
+        # polls the next due device, returns it or None if nothing was due
+        now = time.monotonic()
+        device = self.next_device(now)
+        if device is None:
+            return None
+
+        registers = [
+            (device.address, parameter, length)
+            for parameter, length in device.registers
+        ]
+        latencies: list[float] = []
+        results = self.transact(registers, device.trials, latencies)
+
+        stats = device.stats
+        stats.polls += 1
+        stats.requests += len(registers)
+        answered = 0
+        for (parameter, _), data in zip(device.registers, results):
+            if data is None:
+                stats.failures += 1
+                continue
+            device.values[parameter] = data
+            answered += 1
+        stats.responses += answered
+        for latency in latencies:
+            stats.latency.observe(latency)
+
+        # keep the rate without bursting to catch up after a stall
+        device.next_due = max(device.next_due + device.period, now)
+        return device
+
+    def time_until_due(self) -> float:
+        if not self.devices:
+            return 1.0
+        next_due = min(device.next_due for device in self.devices.values())
+        return max(next_due - time.monotonic(), 0.0)
+
+    def run(self, callback: Optional[Callable[[BusDevice], None]] = None):
+        while True:
+            device = self.poll()
+            if device is not None and callback is not None:
+                callback(device)
+            elif device is None:
+                time.sleep(self.time_until_due())
+
+    def stats(self) -> dict[str, dict]:
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            name: {
+                "address": device.address,
+                "priority": device.priority,
+                "requested_rate": device.rate,
+                "achieved_rate": device.stats.polls / elapsed,
+                "registers_per_second": device.stats.responses / elapsed,
+                "requests": device.stats.requests,
+                "failures": device.stats.failures,
+                "latency": device.stats.latency.to_dict(),
+            }
+            for name, device in self.devices.items()
+        }
+
+    def report(self) -> str:
+        lines = []
+        for name, stats in self.stats().items():
+            latency = stats["latency"]
+            lines.append(
+                f"{name} ({stats['address']:#x}): requested {stats['requested_rate']:.2f}/s, "
+                f"achieved {stats['achieved_rate']:.2f}/s, "
+                f"{stats['registers_per_second']:.1f} registers/s, "
+                f"{stats['failures']}/{stats['requests']} failed, "
+                f"latency mean {latency['mean'] * 1000:.1f}ms p95 {latency['p95'] * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
+
+
+def main():
+    # polls the BMS plus any further "<address>:<parameter>:<length>" registers,
+    # e.g. of the ESC or display, and prints the stats every 10 seconds
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <port> [address:parameter:length ...]")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+
+    scheduler = SurronBusScheduler(SurronCommunication(serial=open_serial(sys.argv[1])))
+    bms_registers = [
+        BmsParameterId.BatteryVoltage,
+        BmsParameterId.BatteryCurrent,
+        BmsParameterId.CellVoltages1,
+    ]
+    scheduler.add_device(
+        "BMS",
+        bms_params.BMS_ADDRESS,
+        [(parameter.value, parameter.length) for parameter in bms_registers],
+        rate=2.0,
+        priority=1,
+    )
+
+    others: dict[int, list[tuple[int, int]]] = {}
+    for spec in sys.argv[2:]:
+        address, parameter, length = (int(part, 0) for part in spec.split(":"))
+        others.setdefault(address, []).append((parameter, length))
+    for address, registers in others.items():
+        scheduler.add_device(f"{address:#x}", address, registers, rate=1.0, trials=1)
+
+    last_report = time.monotonic()
+    while True:
+        if scheduler.poll() is None:
+            time.sleep(scheduler.time_until_due())
+        if time.monotonic() - last_report >= 10.0:
+            print(scheduler.report())
+            last_report = time.monotonic()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,86 +1,106 @@
 from serial_communication import SerialCommunication
 from surron_cmd import SurronCmd
 from surron_data_packet import SurronDataPacket
-from typing import Optional, Tuple
-from surron_read_result import SurronReadResult
-import logging
+from surron_metrics import SurronMetrics
+from surron_adaptive_timeout import AdaptiveTimeout
+from serial_recovery_policy import SerialRecoveryPolicy
+from surron_protocol import Register, Steps, SurronIo, SurronProtocol
+from typing import Iterator, Optional, Tuple
+from surron_bus_record import SurronBusRecord
+import bms_params
 import time
 
 
-class SurronCommunication:
-    def __init__(self, serial: SerialCommunication):
+class SurronCommunication(SurronProtocol):
+    # runs the SurronProtocol steps on a blocking serial port
+    def __init__(
+        self,
+        serial: SerialCommunication,
+        metrics: Optional[SurronMetrics] = None,
+        adaptive_timeout: Optional[AdaptiveTimeout] = None,
+        recovery: Optional[SerialRecoveryPolicy] = None,
+    ):
+        super().__init__(metrics, adaptive_timeout, recovery)
         self.serial = serial
 
+    def _run(self, steps: Steps):
+        try:
+            step, argument = next(steps)
+            while True:
+                result = None
+                if step is SurronIo.Read:
+                    result = self.serial.read(*argument)
+                elif step is SurronIo.Write:
+                    self.serial.write(argument)
+                elif step is SurronIo.Sleep:
+                    time.sleep(argument)
+                elif step is SurronIo.ResetInput:
+                    self.serial.reset_input_buffer()
+                elif step is SurronIo.Break:
+                    self.serial.send_break()
+                elif step is SurronIo.Reopen:
+                    self.serial.reset()
+                step, argument = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
     def read_register(
         self, address: int, parameter: int, parameter_length: int
     ) -> Optional[bytes]:
-        send_packet = SurronDataPacket.create(
-            SurronCmd.ReadRequest, address, parameter, parameter_length, None
-        )
-
-        for trial in range(3):
-            self.serial.reset_input_buffer()
-            self.serial.write(send_packet.to_bytes())
-
-            # 9600 baud 8N1 = ~960 bytes/s, so 200ms are enough for ~192 bytes.
-            # also, BMS takes some time to responsd sometimes when it is busy updating the display (>80ms in some cases)
-            result, packet = self.receive_packet(0.2)
-
-            if result == SurronReadResult.Success:
-                if (
-                    packet.address == address
-                    and packet.parameter == parameter
-                    and packet.data_length == parameter_length
-                ):
-                    return packet.command_data
-                logging.debug(f"Wrong packet received: {packet}")
-            elif result == SurronReadResult.Timeout:
-                logging.log(
-                    logging.DEBUG if trial < 2 else logging.INFO,
-                    f"Timeout on trial {trial}",
-                )
-            elif result == SurronReadResult.InvalidData:
-                logging.info("Invalid data")
-            else:
-                break
+        return self._run(self.read_register_steps(address, parameter, parameter_length))
 
-            # can not be too high or else BMS goes back into standby (after ~3s)
-            time.sleep(0.1)
-
-        return None
+    def read_registers(
+        self,
+        registers: list[Register],
+        max_in_flight: int = 4,
+        trials: int = 3,
+        match_length: bool = True,
+        probe_timeout: Optional[float] = None,
+        receive_times: Optional[dict[Register, float]] = None,
+    ) -> list[Optional[bytes]]:
+        return self._run(
+            self.read_registers_steps(
+                registers,
+                max_in_flight,
+                trials,
+                match_length,
+                probe_timeout,
+                receive_times,
+            )
+        )
 
     def receive_packet(self, timeout: float) -> Tuple[str, Optional[SurronDataPacket]]:
-        buffer = bytearray(512)
-        buffer_pos = 0
-        header_length = SurronDataPacket.HEADER_LENGTH
+        return self._run(self.receive_packet_steps(timeout))
 
-        header_data = self.serial.read(header_length, timeout)
-        if not header_data:
-            self.serial.reset()
-            return SurronReadResult.Timeout, None
-        buffer[0:header_length] = header_data
-        buffer_pos += header_length
-
-        rest_length = (
-            SurronDataPacket.get_packet_length_from_header(buffer[:header_length])
-            - header_length
-        )
-        if rest_length < 0:
-            print(f"Invalid data: {buffer[:header_length].hex()}")
-            self.serial.reset()
-            return SurronReadResult.InvalidData, None
+    def recover(self):
+        self._run(self.recover_steps())
 
-        remaining_data = self.serial.read(rest_length, timeout)
-        if len(remaining_data) < rest_length:
-            self.serial.reset()
-            return SurronReadResult.Timeout, None
+    def reset_input_buffer(self):
+        self._run(self.reset_input_buffer_steps())
 
-        buffer[buffer_pos : buffer_pos + rest_length] = remaining_data
-        buffer_pos += rest_length
+    def sniff(self, timeout: float = 1.0) -> Iterator[SurronBusRecord]:
+        # listen-only: frame whatever the ESC/display and BMS exchange without
+        # sending anything ourselves
+        while True:
+            packet = self.parser.next_packet()
+            if packet is None:
+                data = self.serial.read(self.parser.bytes_needed(), timeout)
+                if data:
+                    self.parser.feed(data)
+                    continue
+                packet = self.parser.drop_partial_frame()
+                if packet is None:
+                    continue
 
-        packet = SurronDataPacket.from_bytes(buffer[:buffer_pos])
-        if packet is None:
-            self.serial.reset()
-            return SurronReadResult.InvalidData, None
+            timestamp = time.time()
+            parameter = None
+            value = None
+            if packet.address == bms_params.BMS_ADDRESS and packet.command in (
+                SurronCmd.ReadResponse,
+                SurronCmd.Status,
+            ):
+                parameter = bms_params.get_parameter(packet.parameter)
+                if parameter is not None and parameter.length == packet.data_length:
+                    value = bms_params.decode_bms_data(parameter, packet.command_data)
 
-        return SurronReadResult.Success, packet
+            yield SurronBusRecord(timestamp, packet, parameter, value)
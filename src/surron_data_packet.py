@@ -1,7 +1,22 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from surron_cmd import SurronCmd
-from struct import pack, unpack
-from typing import Optional
+from struct import Struct
+from typing import Optional, Union
+
+# command, address, parameter, data length
+HEADER = Struct("<BHBB")
+COMMANDS = {command.value: command for command in SurronCmd}
+
+_frame_structs: dict[int, Struct] = {}
+
+
+def _frame_struct(data_length: int) -> Struct:
+    # header, data, checksum in one struct so encoding is a single pack
+    frame_struct = _frame_structs.get(data_length)
+    if frame_struct is None:
+        frame_struct = _frame_structs[data_length] = Struct(f"<BHBB{data_length}sB")
+    return frame_struct
 
 
 @dataclass
@@ -15,13 +30,15 @@ class SurronHeader:
 class SurronDataPacket:
     HEADER_LENGTH = 5
 
+    __slots__ = ("command", "address", "parameter", "data_length", "command_data")
+
     def __init__(
         self,
         command: SurronCmd,
         address: int,
         parameter: int,
         data_length: int,
-        command_data: Optional[bytes],
+        command_data: Optional[Union[bytes, memoryview]],
     ):
         self.command = command
         self.address = address
@@ -53,12 +70,22 @@ class SurronDataPacket:
         return SurronDataPacket(command, address, parameter, data_length, command_data)
 
     @staticmethod
-    def from_bytes(data: bytes) -> Optional["SurronDataPacket"]:
-        if len(data) < 6:
+    def from_bytes(
+        data: Union[bytes, bytearray, memoryview],
+        copy: bool = True,
+        verify_checksum: bool = True,
+    ) -> Optional["SurronDataPacket"]:
+        # with copy=False command_data is a memoryview into data, so the caller must
+        # keep data alive and unchanged for as long as the packet is used.
+        # verify_checksum=False is for callers that already checked it.
+        length = len(data)
+        if length < 6:
             raise ValueError("Message too short (less than 6 bytes)")
 
-        calc_checksum = SurronDataPacket.calc_checksum(data[:-1])
         read_checksum = data[-1]
+        calc_checksum = (
+            (sum(data) - read_checksum) % 256 if verify_checksum else read_checksum
+        )
 
         if read_checksum != calc_checksum:
             SurronDataPacket.handle_data_error(
@@ -66,50 +93,86 @@ class SurronDataPacket:
             )
             return None
 
-        header = SurronDataPacket.read_header(data[: SurronDataPacket.HEADER_LENGTH])
-        if header is None:
+        command_value, address, parameter, length_byte = HEADER.unpack_from(data)
+        command = COMMANDS.get(command_value)
+        if command is None:
+            SurronDataPacket.handle_data_error(f"Command {command_value} is not valid.")
             return None
+        data_length = length_byte - 1 if command == SurronCmd.Status else length_byte
 
-        expected_length = SurronDataPacket.get_packet_length(
-            header.command, header.data_length
-        )
-        if len(data) != expected_length:
+        expected_length = SurronDataPacket.get_packet_length(command, data_length)
+        if length != expected_length:
             SurronDataPacket.handle_data_error(
-                f"Message too short (expected {expected_length}, got {len(data)})"
+                f"Message too short (expected {expected_length}, got {length})"
             )
             return None
 
-        command_data = (
-            None
-            if header.command == SurronCmd.ReadRequest
-            else data[5 : 5 + header.data_length]
-        )
+        if command == SurronCmd.ReadRequest:
+            command_data = None
+        elif copy:
+            command_data = bytes(data[5 : 5 + data_length])
+        else:
+            command_data = memoryview(data)[5 : 5 + data_length]
 
-        return SurronDataPacket.create(
-            header.command,
-            header.address,
-            header.parameter,
-            header.data_length,
-            bytes(command_data),
-        )
+        return SurronDataPacket(command, address, parameter, data_length, command_data)
 
-    def to_bytes(self) -> bytes:
-        length = SurronDataPacket.get_packet_length(self.command, self.data_length)
-        bytes_data = bytearray(length)
-        bytes_data[0] = self.command.value
-        bytes_data[1:3] = pack("<H", self.address)
-        bytes_data[3] = self.parameter
-        bytes_data[4] = (
+    def _frame_values(self) -> tuple:
+        length_byte = (
             self.data_length + 1
             if self.command == SurronCmd.Status
             else self.data_length
         )
+        if self.command == SurronCmd.ReadRequest or not self.command_data:
+            payload = b""
+        else:
+            payload = self.command_data
+        checksum = (
+            self.command.value
+            + (self.address & 0xFF)
+            + (self.address >> 8)
+            + self.parameter
+            + length_byte
+            + sum(payload)
+        ) % 256
+        return (
+            self.command.value,
+            self.address,
+            self.parameter,
+            length_byte,
+            payload,
+            checksum,
+        )
 
-        if self.command != SurronCmd.ReadRequest and self.command_data:
-            bytes_data[5 : 5 + self.data_length] = self.command_data
+    def _frame_data_length(self) -> int:
+        return 0 if self.command == SurronCmd.ReadRequest else self.data_length
 
-        bytes_data[-1] = SurronDataPacket.calc_checksum(bytes_data[:-1])
-        return bytes(bytes_data)
+    def to_bytes(self) -> bytes:
+        values = self._frame_values()
+        if isinstance(values[4], memoryview):
+            # struct only packs bytes, e.g. for packets from from_bytes(copy=False)
+            values = (*values[:4], values[4].tobytes(), values[5])
+        return _frame_struct(self._frame_data_length()).pack(*values)
+
+    def pack_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        # encodes into a preallocated buffer, returns the number of bytes written.
+        # The payload is slice-assigned, so it may be bytes or a memoryview.
+        command, address, parameter, length_byte, payload, checksum = (
+            self._frame_values()
+        )
+        HEADER.pack_into(buffer, offset, command, address, parameter, length_byte)
+        start = offset + self.HEADER_LENGTH
+        end = start + len(payload)
+        buffer[start:end] = payload
+        buffer[end] = checksum
+        return end + 1 - offset
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def read_request_frame(address: int, parameter: int, data_length: int) -> bytes:
+        # ReadRequests never change, so every register's frame is only built once
+        return SurronDataPacket(
+            SurronCmd.ReadRequest, address, parameter, data_length, None
+        ).to_bytes()
 
     @staticmethod
     def calc_checksum(data: bytes) -> int:
@@ -131,9 +194,8 @@ class SurronDataPacket:
             SurronDataPacket.handle_data_error(f"Command {command} is not valid.")
             return None
 
-        address = unpack("<H", header[1:3])[0]
-        parameter = header[3]
-        data_length = header[4] - 1 if command == SurronCmd.Status else header[4]
+        _, address, parameter, length_byte = HEADER.unpack_from(header)
+        data_length = length_byte - 1 if command == SurronCmd.Status else length_byte
         return SurronHeader(command, address, parameter, data_length)
 
     @staticmethod
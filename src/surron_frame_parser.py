@@ -0,0 +1,131 @@
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket, COMMANDS
+from surron_metrics import SurronMetrics
+from typing import Iterator, Optional
+
+COMMAND_BYTES = tuple(bytes([command.value]) for command in SurronCmd)
+# the longest known register is 64 bytes, a stray command byte in front of a frame
+# must not make the parser wait for up to 255 bytes that never come
+MAX_DATA_LENGTH = 128
+
+
+class SurronFrameParser:
+    def __init__(self, metrics: Optional[SurronMetrics] = None):
+        self.buffer = bytearray()
+        self.metrics = metrics
+        self.resync_count = 0
+        self.discarded_bytes = 0
+        self.checksum_errors = 0
+
+    def feed(self, data: bytes):
+        self.buffer += data
+
+    def reset(self):
+        self.buffer.clear()
+
+    def packets(self) -> Iterator[SurronDataPacket]:
+        packet = self.next_packet()
+        while packet is not None:
+            yield packet
+            packet = self.next_packet()
+
+    def bytes_needed(self) -> int:
+        # how many bytes are missing for the frame at the start of the buffer,
+        # so that blocking reads never wait for more data than the next frame needs
+        header_length = SurronDataPacket.HEADER_LENGTH
+        if len(self.buffer) < header_length:
+            return header_length - len(self.buffer)
+        frame_length = self._frame_length()
+        if frame_length < 0:
+            return 1
+        return max(frame_length - len(self.buffer), 1)
+
+    def next_packet(self) -> Optional[SurronDataPacket]:
+        discarded = self._skip_to_command()
+        try:
+            while len(self.buffer) >= SurronDataPacket.HEADER_LENGTH:
+                frame_length = self._frame_length()
+                if frame_length < 0:
+                    self._drop_byte()
+                    discarded = True
+                    continue
+
+                if len(self.buffer) < frame_length:
+                    return None
+
+                # view into the buffer so only the payload gets copied, it has to be
+                # released before the buffer can be shrunk
+                frame = memoryview(self.buffer)[:frame_length]
+                try:
+                    checksum = (sum(frame) - frame[-1]) % 256
+                    packet = (
+                        SurronDataPacket.from_bytes(frame, verify_checksum=False)
+                        if checksum == frame[-1]
+                        else None
+                    )
+                finally:
+                    frame.release()
+
+                if packet is None:
+                    self.checksum_errors += 1
+                    if self.metrics is not None:
+                        self.metrics.count("checksum_errors")
+                    self._drop_byte()
+                    discarded = True
+                    continue
+
+                del self.buffer[:frame_length]
+                return packet
+            return None
+        finally:
+            if discarded:
+                self.resync_count += 1
+                if self.metrics is not None:
+                    self.metrics.count("resyncs")
+
+    def drop_partial_frame(self) -> Optional[SurronDataPacket]:
+        # Called when no more data arrives for the frame at the start of the
+        # buffer: its command byte was most likely a stray byte, so skip it and
+        # look for a complete frame behind it.
+        if not self.buffer:
+            return None
+        self.resync_count += 1
+        if self.metrics is not None:
+            self.metrics.count("resyncs")
+        while self.buffer:
+            self._drop_byte()
+            packet = self.next_packet()
+            if packet is not None:
+                return packet
+        return None
+
+    def _frame_length(self) -> int:
+        command = COMMANDS[self.buffer[0]]
+        length_byte = self.buffer[4]
+        if command == SurronCmd.Status:
+            if length_byte == 0:
+                return -1
+            length_byte -= 1
+        if length_byte > MAX_DATA_LENGTH:
+            return -1
+        return SurronDataPacket.get_packet_length(command, length_byte)
+
+    def _drop_byte(self):
+        del self.buffer[:1]
+        self._count_discarded(1)
+        self._skip_to_command()
+
+    def _skip_to_command(self) -> bool:
+        positions = [self.buffer.find(command) for command in COMMAND_BYTES]
+        positions = [position for position in positions if position >= 0]
+        skip = min(positions) if positions else len(self.buffer)
+        if skip == 0:
+            return False
+        del self.buffer[:skip]
+        self._count_discarded(skip)
+        return True
+
+    def _count_discarded(self, count: int):
+        self.discarded_bytes += count
+        if self.metrics is not None:
+            self.metrics.count("discarded_bytes", count)
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from typing import Callable, Optional
+import bisect
+import logging
+import time
+
+# seconds, the last bucket catches everything above 1s
+LATENCY_BUCKETS = (0.01, 0.02, 0.03, 0.05, 0.08, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        # upper bound of the bucket that contains the q-th percentile
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "buckets": dict(zip([*self.buckets, float("inf")], self.counts)),
+        }
+
+
+class SurronMetrics:
+    # Plain counters and per-parameter latency histograms, cheap enough to always
+    # keep enabled. Exporters are callables that get a snapshot() dict, either on
+    # export() or automatically every export_interval seconds.
+    def __init__(self, export_interval: Optional[float] = None):
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.latencies: dict[int, LatencyHistogram] = {}
+        self.exporters: list[Callable[[dict], None]] = []
+        self.export_interval = export_interval
+        self.last_export = time.monotonic()
+
+    def add_exporter(self, exporter: Callable[[dict], None]):
+        self.exporters.append(exporter)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+        if self.export_interval is not None:
+            self._maybe_export()
+
+    def observe_latency(self, parameter: int, seconds: float):
+        histogram = self.latencies.get(parameter)
+        if histogram is None:
+            histogram = self.latencies[parameter] = LatencyHistogram()
+        histogram.observe(seconds)
+        if self.export_interval is not None:
+            self._maybe_export()
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "latency": {
+                parameter: histogram.to_dict()
+                for parameter, histogram in self.latencies.items()
+            },
+        }
+
+    def export(self):
+        self.last_export = time.monotonic()
+        if not self.exporters:
+            return
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter(snapshot)
+
+    def _maybe_export(self):
+        if time.monotonic() - self.last_export >= self.export_interval:
+            self.export()
+
+
+def log_exporter(snapshot: dict):
+    counters = ", ".join(f"{k}={v}" for k, v in sorted(snapshot["counters"].items()))
+    logging.info(f"Counters: {counters}")
+    for parameter, latency in snapshot["latency"].items():
+        logging.info(
+            f"Parameter {parameter:02X}: {latency['count']} reads, "
+            f"mean {latency['mean'] * 1000:.1f}ms, p95 {latency['p95'] * 1000:.0f}ms, "
+            f"max {latency['max'] * 1000:.1f}ms"
+        )
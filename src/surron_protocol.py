@@ -0,0 +1,279 @@
+from enum import Enum
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket
+from surron_frame_parser import SurronFrameParser
+from surron_metrics import SurronMetrics
+from surron_adaptive_timeout import AdaptiveTimeout
+from serial_recovery_policy import RecoveryTier, SerialRecoveryPolicy
+from surron_read_result import SurronReadResult
+from typing import Generator, Optional, Tuple
+from collections import deque
+import logging
+import time
+
+Register = Tuple[int, int, int]
+
+
+class SurronIo(Enum):
+    # what a protocol step asks the transport to do, see SurronProtocol
+    Write = 1  # argument: frame
+    Read = 2  # argument: (length, timeout), result: bytes
+    Sleep = 3  # argument: seconds
+    ResetInput = 4
+    Break = 5
+    Reopen = 6
+
+
+IoStep = Tuple[SurronIo, object]
+Steps = Generator[IoStep, object, object]
+
+
+class SurronProtocol:
+    # Request/response state machine without any I/O: the operations are
+    # generators that yield (SurronIo, argument) steps and get the result of
+    # each step sent back. SurronCommunication runs them on a blocking serial
+    # port and AsyncSurronCommunication awaits them.
+    def __init__(
+        self,
+        metrics: Optional[SurronMetrics] = None,
+        adaptive_timeout: Optional[AdaptiveTimeout] = None,
+        recovery: Optional[SerialRecoveryPolicy] = None,
+        log_prefix: str = "",
+    ):
+        self.metrics = SurronMetrics() if metrics is None else metrics
+        self.adaptive_timeout = adaptive_timeout
+        self.recovery = SerialRecoveryPolicy() if recovery is None else recovery
+        self.parser = SurronFrameParser(self.metrics)
+        self.log_prefix = log_prefix
+
+    def read_register_steps(
+        self, address: int, parameter: int, parameter_length: int
+    ) -> Steps:
+        request_frame = SurronDataPacket.read_request_frame(
+            address, parameter, parameter_length
+        )
+
+        for trial in range(3):
+            yield from self.reset_input_buffer_steps()
+            if trial > 0:
+                self.metrics.count("retries")
+            self.metrics.count("requests")
+            yield SurronIo.Write, request_frame
+            sent_at = time.monotonic()
+
+            result, packet = yield from self.receive_packet_steps(
+                self.receive_timeout(parameter, parameter_length)
+            )
+
+            if result == SurronReadResult.Success:
+                if (
+                    packet.address == address
+                    and packet.parameter == parameter
+                    and packet.data_length == parameter_length
+                ):
+                    self.observe_latency(
+                        parameter, parameter_length, time.monotonic() - sent_at
+                    )
+                    return packet.command_data
+                self.metrics.count("wrong_packets")
+                logging.debug(f"{self.log_prefix}Wrong packet received: {packet}")
+            elif result == SurronReadResult.Timeout:
+                self.observe_timeout(parameter, parameter_length)
+                logging.log(
+                    logging.DEBUG if trial < 2 else logging.INFO,
+                    f"{self.log_prefix}Timeout on trial {trial}",
+                )
+            elif result == SurronReadResult.InvalidData:
+                logging.info(f"{self.log_prefix}Invalid data")
+            else:
+                break
+
+            # can not be too high or else BMS goes back into standby (after ~3s)
+            yield SurronIo.Sleep, self.backoff(trial)
+
+        self.metrics.count("failed_reads")
+        return None
+
+    def read_registers_steps(
+        self,
+        registers: list[Register],
+        max_in_flight: int = 4,
+        trials: int = 3,
+        match_length: bool = True,
+        probe_timeout: Optional[float] = None,
+        receive_times: Optional[dict[Register, float]] = None,
+    ) -> Steps:
+        # registers are (address, parameter, parameter_length) tuples. Requests are sent
+        # back-to-back with up to max_in_flight outstanding at once and responses are
+        # matched by their header, so only the registers that failed are retried.
+        # Without match_length any response length is accepted, e.g. to find out
+        # the real length of a register.
+        # With probe_timeout the registers may not exist: a missing answer is
+        # expected, so the fixed probe_timeout is used and a timeout is neither
+        # learned by the adaptive timeout nor handled as a link fault.
+        # receive_times gets the monotonic time each response was received.
+        results: dict[Register, bytes] = {}
+        remaining = list(dict.fromkeys(registers))
+        if match_length:
+            by_header = {register: register for register in remaining}
+        else:
+            by_header = {register[:2]: register for register in remaining}
+
+        for trial in range(trials):
+            yield from self.reset_input_buffer_steps()
+            queue = deque(remaining)
+            pending = set(remaining)
+            in_flight: set[Register] = set()
+            sent_at: dict[Register, float] = {}
+            last_response_at = 0.0
+
+            while queue or in_flight:
+                while queue and len(in_flight) < max_in_flight:
+                    register = queue.popleft()
+                    request_frame = SurronDataPacket.read_request_frame(*register)
+                    if trial > 0:
+                        self.metrics.count("retries")
+                    self.metrics.count("requests")
+                    yield SurronIo.Write, request_frame
+                    sent_at[register] = last_progress = time.monotonic()
+                    in_flight.add(register)
+
+                # give up on the outstanding requests if nothing matching arrived
+                # in time, other traffic (e.g. Status packets) isn't progress
+                if probe_timeout is not None:
+                    timeout = probe_timeout
+                else:
+                    timeout = max(
+                        self.receive_timeout(parameter, length)
+                        for _, parameter, length in in_flight
+                    )
+                remaining_time = last_progress + timeout - time.monotonic()
+                if remaining_time > 0:
+                    result, packet = yield from self.receive_packet_steps(
+                        remaining_time, recover=probe_timeout is None
+                    )
+                else:
+                    result, packet = SurronReadResult.Timeout, None
+
+                if result == SurronReadResult.Success:
+                    header = (packet.address, packet.parameter, packet.data_length)
+                    register = by_header.get(header if match_length else header[:2])
+                    if packet.command == SurronCmd.ReadResponse and register in pending:
+                        now = time.monotonic()
+                        results[register] = packet.command_data
+                        if receive_times is not None:
+                            receive_times[register] = now
+                        # in a pipeline the BMS only starts on a request after
+                        # answering the previous one
+                        self.observe_latency(
+                            packet.parameter,
+                            packet.data_length,
+                            now - max(sent_at[register], last_response_at),
+                        )
+                        last_response_at = last_progress = now
+                        pending.discard(register)
+                        in_flight.discard(register)
+                        continue
+                    self.metrics.count("wrong_packets")
+                    logging.debug(f"{self.log_prefix}Wrong packet received: {packet}")
+                elif result == SurronReadResult.Timeout:
+                    logging.log(
+                        logging.DEBUG if trial < trials - 1 else logging.INFO,
+                        f"{self.log_prefix}Timeout on trial {trial} "
+                        f"waiting for {len(in_flight)} responses",
+                    )
+                    # give up on the outstanding requests for this trial, late responses
+                    # are still accepted as long as the register is pending
+                    if probe_timeout is None:
+                        for _, parameter, length in in_flight:
+                            self.observe_timeout(parameter, length)
+                    in_flight.clear()
+                elif result == SurronReadResult.InvalidData:
+                    logging.info(f"{self.log_prefix}Invalid data")
+
+            remaining = [register for register in remaining if register not in results]
+            if not remaining:
+                break
+
+            # can not be too high or else BMS goes back into standby (after ~3s)
+            yield SurronIo.Sleep, self.backoff(trial)
+
+        self.metrics.count("failed_reads", len(remaining))
+        return [results.get(register) for register in registers]
+
+    def receive_packet_steps(self, timeout: float, recover: bool = True) -> Steps:
+        deadline = time.monotonic() + timeout
+        resync_count = self.parser.resync_count
+
+        while True:
+            packet = self.parser.next_packet()
+            if packet is not None:
+                self.recovery.on_success()
+                return SurronReadResult.Success, packet
+
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                break
+            data = yield SurronIo.Read, (self.parser.bytes_needed(), remaining_time)
+            if not data:
+                break
+            self.parser.feed(data)
+
+        # nothing more arrives for a started frame, it may have been a stray byte
+        # that looked like a command in front of a complete frame
+        packet = self.parser.drop_partial_frame()
+        if packet is not None:
+            self.recovery.on_success()
+            return SurronReadResult.Success, packet
+
+        if self.parser.resync_count != resync_count:
+            # corrupt bytes are skipped by the parser, no need to reopen the port
+            logging.debug(
+                f"{self.log_prefix}Resynchronized, buffered: {self.parser.buffer.hex()}"
+            )
+            self.metrics.count("invalid_data")
+            return SurronReadResult.InvalidData, None
+
+        self.metrics.count("timeouts")
+        if recover:
+            yield from self.recover_steps()
+        return SurronReadResult.Timeout, None
+
+    def recover_steps(self) -> Steps:
+        tier = self.recovery.on_failure()
+        self.metrics.count(f"recovery_{tier.name.lower()}")
+        if tier == RecoveryTier.Reopen:
+            self.metrics.count("port_resets")
+            yield SurronIo.Reopen, None
+        elif tier == RecoveryTier.Break:
+            yield SurronIo.Break, None
+        yield from self.reset_input_buffer_steps()
+
+    def reset_input_buffer_steps(self) -> Steps:
+        yield SurronIo.ResetInput, None
+        self.parser.reset()
+
+    def receive_timeout(self, parameter: int, parameter_length: int) -> float:
+        if self.adaptive_timeout is None:
+            # 9600 baud 8N1 = ~960 bytes/s, so 200ms are enough for ~192 bytes.
+            # also, BMS takes some time to responsd sometimes when it is busy updating the display (>80ms in some cases)
+            return 0.2
+        return self.adaptive_timeout.timeout(parameter, parameter_length)
+
+    def backoff(self, trial: int) -> float:
+        if self.adaptive_timeout is None:
+            return 0.1
+        return self.adaptive_timeout.backoff(trial)
+
+    def observe_timeout(self, parameter: int, parameter_length: int):
+        if self.adaptive_timeout is not None:
+            self.adaptive_timeout.observe_timeout(
+                parameter,
+                parameter_length,
+                self.adaptive_timeout.timeout(parameter, parameter_length),
+            )
+
+    def observe_latency(self, parameter: int, parameter_length: int, latency: float):
+        self.metrics.observe_latency(parameter, latency)
+        if self.adaptive_timeout is not None:
+            self.adaptive_timeout.observe(parameter, parameter_length, latency)
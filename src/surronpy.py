@@ -1,17 +1,23 @@
 from surron_communication import SurronCommunication
-from serial_communication import SerialCommunication
+from surron_bms_communication import SurronBmsCommunication
+from serial_communication import open_serial
+from bms_register_discovery import load_default_parameter_map
 import bms_params
 from bms_params import BmsParameterId
 import logging
+import sys
 
 
 def main():
-    comm = SurronCommunication(serial=SerialCommunication("/dev/ttyUSB0"))
+    port = sys.argv[1] if len(sys.argv) > 1 else "/dev/ttyUSB0"
+    comm = SurronCommunication(serial=open_serial(port))
+    bms_comm = SurronBmsCommunication(comm)
 
     logging.basicConfig(level=logging.DEBUG)
+    load_default_parameter_map()
 
     for param in BmsParameterId:
-        data = comm.read_bms_parameter(param)
+        data = bms_comm.read_raw_parameter_data(param)
         decoded = bms_params.decode_bms_data(param, data)
         if type(decoded) is not bytes:
             print(f"{param.name}: {decoded}")
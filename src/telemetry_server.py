@@ -0,0 +1,218 @@
+from async_surron_bms_communication import AsyncSurronBmsCommunication
+from async_surron_communication import AsyncSurronCommunication
+from async_serial_communication import AsyncSerialCommunication
+from bms_params import BmsParameterId
+from datetime import date
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+default_params = [
+    BmsParameterId.BatteryVoltage,
+    BmsParameterId.BatteryCurrent,
+    BmsParameterId.BatteryPercent,
+]
+
+# parameters only asked for via /snapshot are dropped from polling after this
+ON_DEMAND_TIMEOUT = 60.0
+
+
+def to_json(value) -> str:
+    def default(obj):
+        if isinstance(obj, date):
+            return obj.isoformat()
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return obj.hex()
+        if isinstance(obj, BmsParameterId):
+            return obj.name
+        raise TypeError(f"{type(obj)} is not JSON serializable")
+
+    return json.dumps(value, default=default)
+
+
+class Subscription:
+    def __init__(self, params: set[BmsParameterId]):
+        self.params = params
+        self.updates: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+    def push(self, update: dict):
+        if self.updates.full():
+            # slow client, it only needs the newest values
+            self.updates.get_nowait()
+        self.updates.put_nowait(update)
+
+
+class TelemetryServer:
+    # Owns the bus: one poller reads the union of everything clients asked for and
+    # fans the values out, instead of every tool opening the port itself.
+    def __init__(
+        self,
+        bms_comm: AsyncSurronBmsCommunication,
+        params: list[BmsParameterId] = default_params,
+        interval: float = 1.0,
+    ):
+        self.bms_comm = bms_comm
+        self.params = set(params)
+        self.interval = interval
+        self.latest: dict[BmsParameterId, tuple[float, object]] = {}
+        self.subscriptions: set[Subscription] = set()
+        self.on_demand: dict[BmsParameterId, float] = {}
+
+    def polled_params(self) -> list[BmsParameterId]:
+        now = time.monotonic()
+        for param, last_access in list(self.on_demand.items()):
+            if now - last_access > ON_DEMAND_TIMEOUT:
+                del self.on_demand[param]
+        params = set(self.params) | set(self.on_demand)
+        for subscription in self.subscriptions:
+            params |= subscription.params
+        return sorted(params, key=lambda param: param.value)
+
+    async def poll(self):
+        while True:
+            cycle_start = time.monotonic()
+            values = await self.bms_comm.read_parameters(self.polled_params())
+            timestamp = time.time()
+
+            fresh = {}
+            for param, value in values.items():
+                if value is not None:
+                    self.latest[param] = (timestamp, value)
+                    fresh[param] = value
+
+            for subscription in self.subscriptions:
+                update = {
+                    param.name: value
+                    for param, value in fresh.items()
+                    if param in subscription.params
+                }
+                if update:
+                    subscription.push({"timestamp": timestamp, "values": update})
+
+            await asyncio.sleep(
+                max(self.interval - (time.monotonic() - cycle_start), 0)
+            )
+
+    def snapshot(self, params: set[BmsParameterId]) -> dict:
+        # parameters that aren't polled yet are added to the next poll cycle and
+        # are missing from this answer
+        now = time.monotonic()
+        result = {}
+        for param in params:
+            if param not in self.params:
+                self.on_demand[param] = now
+            if param in self.latest:
+                timestamp, value = self.latest[param]
+                result[param.name] = {"timestamp": timestamp, "value": value}
+        return result
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # headers aren't needed
+
+            parts = request_line.decode("ascii", "replace").split()
+            if len(parts) < 2 or parts[0] != "GET":
+                await self.respond(writer, 405, {"error": "only GET is supported"})
+                return
+
+            url = urlsplit(parts[1])
+            try:
+                params = self.parse_params(url.query)
+            except KeyError as e:
+                await self.respond(writer, 400, {"error": f"unknown parameter {e}"})
+                return
+
+            if url.path == "/snapshot":
+                await self.respond(writer, 200, self.snapshot(params))
+            elif url.path == "/stream":
+                await self.stream(writer, params)
+            elif url.path == "/parameters":
+                await self.respond(
+                    writer,
+                    200,
+                    {param.name: param.length for param in BmsParameterId},
+                )
+            else:
+                await self.respond(writer, 404, {"error": "not found"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def parse_params(self, query: str) -> set[BmsParameterId]:
+        names = parse_qs(query).get("params")
+        if not names:
+            return set(self.params)
+        return {
+            BmsParameterId[name] for value in names for name in value.split(",") if name
+        }
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, body: dict):
+        data = to_json(body).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found"}.get(
+            status, "Method Not Allowed"
+        )
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode()
+            + data
+        )
+        await writer.drain()
+
+    async def stream(self, writer: asyncio.StreamWriter, params: set[BmsParameterId]):
+        # server-sent events, one event per poll cycle with the subscribed values
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        await writer.drain()
+
+        subscription = Subscription(params)
+        self.subscriptions.add(subscription)
+        try:
+            while True:
+                update = await subscription.updates.get()
+                writer.write(f"data: {to_json(update)}\n\n".encode())
+                await writer.drain()
+        finally:
+            self.subscriptions.discard(subscription)
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        logging.info(f"Serving telemetry on http://{host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.poll())
+
+
+async def run(serial_port: str, host: str, port: int, interval: float):
+    comm = AsyncSurronCommunication(AsyncSerialCommunication(serial_port))
+    server = TelemetryServer(AsyncSurronBmsCommunication(comm), interval=interval)
+    await server.serve(host, port)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve live BMS values over HTTP")
+    parser.add_argument("serial_port", nargs="?", default="/dev/ttyUSB0")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.serial_port, args.host, args.port, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from bms_deadband_log import Deadband, DeadbandLogReader, DeadbandRecorder
+from bms_params import BmsParameterId
+
+
+def test_relative_deadband_at_zero():
+    deadband = Deadband(relative=0.01)
+    assert not deadband.exceeded(0.0, 0.0)
+    assert deadband.exceeded(0.0, 0.1)
+    assert not deadband.exceeded(10.0, 10.05)
+    assert deadband.exceeded(10.0, 10.2)
+
+
+def test_only_changes_are_recorded(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with DeadbandRecorder(path, heartbeat=100.0) as recorder:
+        written = [
+            recorder.record(BmsParameterId.RemainingCapacity, 0.0, timestamp)
+            for timestamp in range(5)
+        ]
+    assert written == [1, 0, 0, 0, 0]
+
+
+def test_values_read_back_unchanged(tmp_path):
+    path = str(tmp_path / "log.csv")
+    with DeadbandRecorder(path) as recorder:
+        recorder.record(
+            BmsParameterId.Versions, {"sw_version": "1.10", "idx": "0001"}, 1.0
+        )
+        recorder.record(BmsParameterId.SerialNumber, "000123", 1.0)
+        recorder.record(BmsParameterId.ChargeCycles, 42, 1.0)
+        recorder.record(BmsParameterId.BatteryVoltage, 60.0, 2.0)
+
+    rows = list(DeadbandLogReader(path).rows())
+    assert rows[-1] == (
+        2.0,
+        {
+            "Versions.sw_version": "1.10",
+            "Versions.idx": "0001",
+            "SerialNumber": "000123",
+            "ChargeCycles": 42,
+            "BatteryVoltage": 60.0,
+        },
+    )
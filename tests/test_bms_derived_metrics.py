@@ -0,0 +1,38 @@
+from bms_derived_metrics import DerivedMetrics
+from bms_params import BmsParameterId
+
+
+def test_one_power_sample_per_cycle():
+    derived = DerivedMetrics()
+    for timestamp in range(11):
+        # current first, update_all must still pair it with this cycle's voltage
+        derived.update_all(
+            {
+                BmsParameterId.BatteryCurrent: -10.0,
+                BmsParameterId.BatteryVoltage: 60.0 + timestamp,
+            },
+            {
+                BmsParameterId.BatteryCurrent: float(timestamp),
+                BmsParameterId.BatteryVoltage: float(timestamp),
+            },
+        )
+
+    assert derived.power.count == 11
+    assert derived.power.min == -700.0
+    assert derived.power.max == -600.0
+    # trapezoid over 10s of -600W..-700W
+    assert abs(derived.energy.negative - 6500.0) < 1e-9
+    assert derived.energy.positive == 0.0
+    assert abs(derived.charge.negative - 100.0) < 1e-9
+
+
+def test_cell_voltages2_fill_cells_17_to_32():
+    derived = DerivedMetrics()
+    derived.update(BmsParameterId.CellVoltages2, [3.5] * 16, 0.0)
+    assert derived.cells == [0.0] * 16 + [3.5] * 16
+
+    derived.update(BmsParameterId.CellVoltages1, [3.3] * 16, 1.0)
+    assert derived.cells == [3.3] * 16 + [3.5] * 16
+    # cell 17 is tracked in its own slot from the start
+    assert derived.cell_drift[16].count == 2
+    assert derived.cell_drift[0].count == 1
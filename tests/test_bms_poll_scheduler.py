@@ -0,0 +1,52 @@
+from bms_params import BmsParameterId
+from bms_poll_scheduler import BmsPollScheduler
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_bms_communication import SurronBmsCommunication
+from surron_communication import SurronCommunication
+import time
+
+
+def make_scheduler(bms: SimulatedBms, periods: dict) -> BmsPollScheduler:
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+    return BmsPollScheduler(SurronBmsCommunication(comm), periods)
+
+
+def test_each_value_has_its_receive_time():
+    parameters = [
+        BmsParameterId.BatteryVoltage,
+        BmsParameterId.BatteryCurrent,
+        BmsParameterId.RtcTime,
+    ]
+    scheduler = make_scheduler(
+        SimulatedBms(latency=0.02), {parameter: 1.0 for parameter in parameters}
+    )
+
+    start = time.monotonic()
+    fresh = scheduler.poll()
+    end = time.monotonic()
+
+    assert list(fresh) == parameters
+    times = [scheduler.timestamps[parameter][0] for parameter in parameters]
+    # stamped as they arrive, not all at the end of the batch
+    assert start < times[0] < times[1] < times[2] <= end
+
+
+def test_run_returns_once_static_values_are_read():
+    scheduler = make_scheduler(
+        SimulatedBms(latency=0.0), {BmsParameterId.SerialNumber: None}
+    )
+    received = []
+    scheduler.run(received.append)
+    assert list(received[0]) == [BmsParameterId.SerialNumber]
+    assert scheduler.time_until_due() == float("inf")
+
+
+def test_failed_read_is_retried_after_a_delay():
+    scheduler = make_scheduler(
+        SimulatedBms(latency=0.0, no_response_rate=1.0),
+        {BmsParameterId.SerialNumber: None},
+    )
+    assert scheduler.poll() == {}
+    assert scheduler.stats[BmsParameterId.SerialNumber].failures == 1
+    assert scheduler.poll() == {}
+    assert 0 < scheduler.time_until_due() <= scheduler.retry_delay
@@ -0,0 +1,29 @@
+from bms_params import BmsParameterId, get_parameter
+from bms_register_discovery import discover
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_adaptive_timeout import AdaptiveTimeout
+from surron_communication import SurronCommunication
+
+
+def test_silent_registers_are_not_link_faults():
+    bms = SimulatedBms(latency=0.0)
+    response = bms.response
+    # registers the BMS doesn't have stay silent
+    bms.response = lambda request: (
+        response(request) if get_parameter(request.parameter) is not None else None
+    )
+    adaptive = AdaptiveTimeout()
+    comm = SurronCommunication(
+        SimulatedSerialCommunication(bms), adaptive_timeout=adaptive
+    )
+
+    found = discover(comm, parameters=range(64))
+
+    assert {register.parameter for register in found} == {
+        parameter.value for parameter in BmsParameterId if parameter.value < 64
+    }
+    assert "recovery_break" not in comm.metrics.counters
+    assert "port_resets" not in comm.metrics.counters
+    assert comm.recovery.consecutive_failures == 0
+    # only the answers are learned, the silent probes don't stretch the timeout
+    assert max(adaptive.all_samples) < 0.05
@@ -0,0 +1,43 @@
+from mp_surron_core import (
+    BMS_ADDRESS,
+    PARAM_BATTERY_VOLTAGE,
+    StubUart,
+    SurronCore,
+    UartCommunication,
+)
+from simulated_bms import SimulatedBms
+
+
+def create(prefix: bytes = b"") -> SurronCore:
+    bms = SimulatedBms(latency=0.0)
+    uart = StubUart(
+        lambda data: prefix + b"".join(frame for _, frame in bms.receive(data))
+    )
+    return SurronCore(UartCommunication(uart))
+
+
+def test_read_register():
+    core = create()
+    assert core.read_register(BMS_ADDRESS, PARAM_BATTERY_VOLTAGE, 4)
+    assert core.uint32() == 64000
+
+
+def test_stray_command_byte_before_response():
+    for prefix in (b"\x57", b"\x47", b"\x00\x57"):
+        core = create(prefix)
+        assert core.read_register(BMS_ADDRESS, PARAM_BATTERY_VOLTAGE, 4, trials=1)
+        assert core.uint32() == 64000
+        assert core.resyncs == 1
+
+
+def test_no_bytes_lost_when_buffer_is_full():
+    frame = bytes([0x47, 0x16, 0x01, 0x09, 0x04, 0x00, 0xFA, 0x00, 0x00])
+    frame += bytes([sum(frame) & 0xFF])
+    uart = StubUart()
+    uart.feed(frame * 12)
+    # smaller than the 64 byte chunks read from the UART
+    core = SurronCore(UartCommunication(uart), rx_size=40)
+    for _ in range(12):
+        assert core.receive(10)
+        assert core.uint32() == 64000
+    assert core.discarded_bytes == 0
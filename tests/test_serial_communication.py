@@ -0,0 +1,81 @@
+from async_serial_communication import AsyncSerialCommunication
+from async_surron_communication import AsyncSurronCommunication
+from bms_params import BmsParameterId, BMS_ADDRESS
+from serial_communication import SerialCommunication
+from serial_recovery_policy import RecoveryTier, SerialRecoveryPolicy
+from simulated_bms import SimulatedBms
+import asyncio
+import os
+import serial
+
+
+def test_recovery_escalates_and_starts_over():
+    policy = SerialRecoveryPolicy(break_after=2, reopen_after=4)
+    tiers = [policy.on_failure() for _ in range(5)]
+    assert tiers == [
+        RecoveryTier.Drain,
+        RecoveryTier.Break,
+        RecoveryTier.Break,
+        RecoveryTier.Reopen,
+        RecoveryTier.Drain,
+    ]
+    policy.on_success()
+    assert policy.on_failure() == RecoveryTier.Drain
+
+
+def test_reconnects_when_reset_fails():
+    master, slave = os.openpty()
+    try:
+        comm = SerialCommunication(os.ttyname(slave))
+        # e.g. the adapter was unplugged between two polls
+        comm.serial.close()
+        comm.reset_input_buffer()
+        assert comm.serial.is_open
+        assert comm.reconnects == 1
+        comm.close()
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_async_reconnects_after_device_drops():
+    bms = SimulatedBms(latency=0.0)
+    parameter = BmsParameterId.BatteryVoltage
+    master, slave = os.openpty()
+
+    async def read():
+        def answer():
+            # the BMS end of the pty
+            for _, frame in bms.receive(os.read(master, 1024)):
+                os.write(master, frame)
+
+        loop = asyncio.get_running_loop()
+        loop.add_reader(master, answer)
+        port = AsyncSerialCommunication(os.ttyname(slave))
+        comm = AsyncSurronCommunication(port)
+
+        # the device drops in the middle of the first response
+        read = port.serial.read
+        failures = [serial.SerialException("device disconnected")]
+
+        def failing_read(length):
+            if failures:
+                raise failures.pop()
+            return read(length)
+
+        port.serial.read = failing_read
+        try:
+            return port, await comm.read_register(
+                BMS_ADDRESS, parameter.value, parameter.length
+            )
+        finally:
+            loop.remove_reader(master)
+            port.close()
+
+    try:
+        port, data = asyncio.run(read())
+    finally:
+        os.close(master)
+        os.close(slave)
+    assert data == bms.values[parameter]
+    assert port.reconnects == 1
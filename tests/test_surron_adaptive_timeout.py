@@ -0,0 +1,42 @@
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_adaptive_timeout import AdaptiveTimeout
+from surron_communication import SurronCommunication
+import random
+
+
+def test_learns_from_timeouts():
+    # 5% of the responses are much slower than the rest, the adaptive timeout must
+    # not settle below them and cause retries the fixed timeout wouldn't have
+    bms = SimulatedBms(latency=0.01, seed=1)
+    slow = random.Random(2)
+    receive = bms.receive
+    bms.receive = lambda data: [
+        (0.09 if slow.random() < 0.05 else delay, frame)
+        for delay, frame in receive(data)
+    ]
+    comm = SurronCommunication(
+        SimulatedSerialCommunication(bms), adaptive_timeout=AdaptiveTimeout()
+    )
+
+    for _ in range(200):
+        assert comm.read_register(0x116, 9, 4) is not None
+    assert comm.metrics.counters["timeouts"] <= 2
+    assert comm.receive_timeout(9, 4) > 0.09
+
+
+def test_timeout_is_recorded_above_itself():
+    adaptive = AdaptiveTimeout(min_samples=1)
+    adaptive.observe(9, 4, 0.02)
+    timeout = adaptive.timeout(9, 4)
+    adaptive.observe_timeout(9, 4, timeout)
+    assert adaptive.timeout(9, 4) > timeout
+
+
+def test_timeouts_stay_below_default():
+    # a silent BMS must not pin the timeout of a fast register at max_timeout
+    adaptive = AdaptiveTimeout()
+    for _ in range(20):
+        adaptive.observe(9, 4, 0.03)
+    for _ in range(10):
+        adaptive.observe_timeout(9, 4, adaptive.timeout(9, 4))
+    assert adaptive.timeout(9, 4) <= adaptive.default_timeout + adaptive.margin
@@ -0,0 +1,55 @@
+from bms_parameter_cache import BmsParameterCache
+from bms_params import BmsParameterId
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_bms_communication import SurronBmsCommunication
+from surron_communication import SurronCommunication
+import threading
+import time
+
+
+def create(latency: float = 0.02) -> tuple[SimulatedBms, SurronBmsCommunication]:
+    bms = SimulatedBms(latency=latency)
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+    cache = BmsParameterCache(default_ttl=0.2, stale_time=5.0)
+    return bms, SurronBmsCommunication(comm, cache)
+
+
+def test_concurrent_misses_share_one_read():
+    bms, bms_comm = create()
+    values = []
+    threads = [
+        threading.Thread(
+            target=lambda: values.append(
+                bms_comm.read_parameter(BmsParameterId.BatteryVoltage)
+            )
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert values == [64.0] * 3
+    assert bms.requests == 1
+
+
+def test_stale_hit_does_not_wait_for_bus():
+    bms, bms_comm = create()
+    bms_comm.read_parameter(BmsParameterId.BatteryVoltage)
+    time.sleep(0.25)
+
+    busy = threading.Event()
+
+    def hold_bus():
+        with bms_comm.lock:
+            busy.set()
+            time.sleep(0.3)
+
+    holder = threading.Thread(target=hold_bus)
+    holder.start()
+    busy.wait()
+    start = time.monotonic()
+    assert bms_comm.read_parameter(BmsParameterId.BatteryVoltage) == 64.0
+    assert time.monotonic() - start < 0.1
+    holder.join()
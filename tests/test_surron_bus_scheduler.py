@@ -0,0 +1,18 @@
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_bus_scheduler import SurronBusScheduler
+from surron_communication import SurronCommunication
+
+
+def test_latency_is_the_round_trip():
+    bms = SimulatedBms(latency=0.0, no_response_rate=0.3, seed=1)
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+    scheduler = SurronBusScheduler(comm, min_gap=0.05)
+    device = scheduler.add_device("BMS", 0x116, [(9, 4), (8, 4)], rate=100.0)
+
+    for _ in range(5):
+        scheduler.poll()
+
+    latency = device.stats.latency
+    # only first-try answers count, and neither the gaps nor backoffs
+    assert 0 < latency.count < device.stats.responses
+    assert latency.max < scheduler.min_gap
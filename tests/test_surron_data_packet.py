@@ -0,0 +1,34 @@
+from surron_cmd import SurronCmd
+from surron_data_packet import SurronDataPacket
+import pytest
+
+DATA = b"\x01\x02\x03\x04"
+
+
+@pytest.mark.parametrize(
+    "command, data",
+    [
+        (SurronCmd.ReadRequest, None),
+        (SurronCmd.ReadResponse, DATA),
+        (SurronCmd.Status, DATA),
+    ],
+)
+@pytest.mark.parametrize("copy", [True, False])
+def test_round_trip(command, data, copy):
+    frame = SurronDataPacket.create(command, 0x116, 9, 4, data).to_bytes()
+    packet = SurronDataPacket.from_bytes(frame, copy=copy)
+    assert packet.to_bytes() == frame
+
+    buffer = bytearray(len(frame) + 4)
+    length = packet.pack_into(buffer, 2)
+    assert length == len(frame)
+    assert bytes(buffer[2 : 2 + length]) == frame
+
+
+def test_invalid_checksum():
+    frame = bytearray(
+        SurronDataPacket.create(SurronCmd.ReadResponse, 0x116, 9, 4, DATA).to_bytes()
+    )
+    frame[-1] ^= 0xFF
+    with pytest.raises(ValueError):
+        SurronDataPacket.from_bytes(frame)
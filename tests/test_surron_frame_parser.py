@@ -0,0 +1,65 @@
+from surron_cmd import SurronCmd
+from surron_communication import SurronCommunication
+from surron_data_packet import SurronDataPacket
+from surron_frame_parser import SurronFrameParser
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+import bms_params
+import struct
+
+VOLTAGE = struct.pack("<I", 64000)
+
+
+def response_frame() -> bytes:
+    return SurronDataPacket.create(
+        SurronCmd.ReadResponse, bms_params.BMS_ADDRESS, 9, 4, VOLTAGE
+    ).to_bytes()
+
+
+def test_valid_frame():
+    parser = SurronFrameParser()
+    parser.feed(response_frame())
+    packet = parser.next_packet()
+    assert packet.command == SurronCmd.ReadResponse
+    assert bytes(packet.command_data) == VOLTAGE
+    assert parser.resync_count == 0
+
+
+def test_junk_before_frame_is_skipped():
+    parser = SurronFrameParser()
+    parser.feed(b"\x00\x12\x34" + response_frame())
+    packet = parser.next_packet()
+    assert bytes(packet.command_data) == VOLTAGE
+    assert parser.discarded_bytes == 3
+
+
+def test_stray_command_byte_before_frame():
+    for stray in (b"\x47", b"\x57", b"\x00\x57", b"\x12\x47\x00"):
+        parser = SurronFrameParser()
+        parser.feed(stray + response_frame())
+        # the stray byte looks like the start of a longer frame that never completes
+        packet = parser.next_packet()
+        if packet is None:
+            packet = parser.drop_partial_frame()
+        assert packet is not None, stray.hex()
+        assert packet.parameter == 9
+        assert bytes(packet.command_data) == VOLTAGE
+        assert parser.resync_count >= 1
+
+
+def test_oversized_length_is_not_a_frame():
+    parser = SurronFrameParser()
+    parser.feed(bytes([0x47, 0x16, 0x01, 0x09, 0xFF]) + response_frame())
+    packet = parser.next_packet()
+    assert packet is not None
+    assert bytes(packet.command_data) == VOLTAGE
+
+
+def test_read_register_with_stray_byte_before_response():
+    bms = SimulatedBms(latency=0.0)
+    response = bms.response
+    bms.response = lambda request: b"\x57" + response(request)
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+
+    assert comm.read_register(bms_params.BMS_ADDRESS, 9, 4) == VOLTAGE
+    assert comm.metrics.counters["timeouts"] == 0
+    assert comm.metrics.counters["recovery_break"] == 0
@@ -0,0 +1,66 @@
+from async_surron_communication import AsyncSurronCommunication
+from bms_params import BmsParameterId, BMS_ADDRESS
+from simulated_bms import SimulatedBms, SimulatedSerialCommunication
+from surron_communication import SurronCommunication
+import asyncio
+
+REGISTERS = [
+    (BMS_ADDRESS, parameter.value, parameter.length)
+    for parameter in (
+        BmsParameterId.BatteryVoltage,
+        BmsParameterId.BatteryCurrent,
+        BmsParameterId.CellVoltages1,
+    )
+]
+
+
+class AsyncSimulatedSerial:
+    # the blocking simulator behind the AsyncSerialCommunication interface
+    def __init__(self, bms: SimulatedBms):
+        self.serial = SimulatedSerialCommunication(bms)
+        self.port = "simulated"
+
+    async def read(self, length: int, timeout: float) -> bytes:
+        return self.serial.read(length, timeout)
+
+    async def write(self, data: bytes):
+        self.serial.write(data)
+
+    def reset_input_buffer(self):
+        self.serial.reset_input_buffer()
+
+    async def send_break(self):
+        pass
+
+    async def reopen(self):
+        pass
+
+
+def expected(bms: SimulatedBms) -> list[bytes]:
+    return [bms.values[BmsParameterId(parameter)] for _, parameter, _ in REGISTERS]
+
+
+def test_sync_and_async_read_the_same():
+    bms = SimulatedBms(latency=0.0, checksum_error_rate=0.1, seed=1)
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+    assert comm.read_registers(REGISTERS) == expected(bms)
+    assert comm.read_register(*REGISTERS[0]) == expected(bms)[0]
+
+    async def read():
+        comm = AsyncSurronCommunication(AsyncSimulatedSerial(bms))
+        return (
+            await comm.read_registers(REGISTERS),
+            await comm.read_register(*REGISTERS[0]),
+        )
+
+    results, single = asyncio.run(read())
+    assert results == expected(bms)
+    assert single == expected(bms)[0]
+
+
+def test_missing_device_fails_after_trials():
+    bms = SimulatedBms(latency=0.0)
+    comm = SurronCommunication(SimulatedSerialCommunication(bms))
+    assert comm.read_registers([(0x117, 1, 4)], trials=1) == [None]
+    assert comm.metrics.counters["requests"] == 1
+    assert comm.metrics.counters["failed_reads"] == 1